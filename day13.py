@@ -1,142 +1,118 @@
-from pickle import dump, load
-import curses
-from numpy import zeros
-from typing import List, Tuple
-from copy import deepcopy
-
-
-class AMP:
-    def __init__(self, program: List[int]):
-        self.halt = 99
-        self.ops = {
-            1: self.addition, 2: self.multiplication,
-            3: self.receive, 4: self.output,
-            5: self.true_jump, 6: self.false_jump,
-            7: self.less_than, 8: self.equals,
-            9: self.offset_relative,
+from numpy import concatenate, frombuffer, ndarray, zeros, zeros_like
+from time import perf_counter
+from typing import Callable, Optional, Set, Tuple
+
+from intcode import AMP, Memory
+from intcode_snapshot import restore, snapshot
+
+Cell = Tuple[int, int]
+
+
+class CursesScreen:
+    def __init__(self, graphics: dict):
+        self.graphics = graphics
+        self.screen = None
+
+    def open(self, grid: ndarray) -> None:
+        import curses
+        self.screen = curses.initscr()
+        curses.curs_set(0)
+        self.screen.clear()
+        everything = {
+            (i, j) for i in range(grid.shape[0]) for j in range(grid.shape[1])
         }
+        self.draw(grid, everything, 0)
+
+    def close(self) -> None:
+        import curses
+        curses.endwin()
 
-        self.ptr = 0
-        self.relative_base = 0
-        self.program = program
-        self.inputs = []
-
-    def parse_instruction(self, instruction: str) -> Tuple[int, List[int]]:
-        instruction = instruction.rjust(5, "0")
-        operation = int(instruction[-2:])
-        modes = list(map(lambda x: int(x), reversed(instruction[:-2])))
-        return operation, modes
-
-    def fetch(self, parameter: int, mode: int) -> int:
-        if mode == 0:
-            return self.program[parameter]
-        elif mode == 2:
-            return self.program[self.relative_base + parameter]
-        return parameter
-
-    def write(self, parameter: int, value: int, mode: int) -> None:
-        if mode == 0:
-            self.program[parameter] = value
-        elif mode == 2:
-            self.program[self.relative_base + parameter] = value
-
-    def addition(self, modes: List[int]) -> None:
-        ad1 = self.fetch(self.program[self.ptr + 1], modes[0])
-        ad2 = self.fetch(self.program[self.ptr + 2], modes[1])
-        self.write(self.program[self.ptr + 3], ad1 + ad2, modes[2])
-        self.ptr += 4
-
-    def multiplication(self, modes: List[int]) -> None:
-        ad1 = self.fetch(self.program[self.ptr + 1], modes[0])
-        ad2 = self.fetch(self.program[self.ptr + 2], modes[1])
-        self.write(self.program[self.ptr + 3], ad1 * ad2, modes[2])
-        self.ptr += 4
-
-    def receive(self, value: int, modes: List[int]) -> None:
-        self.write(self.program[self.ptr + 1], value, modes[0])
-        self.ptr += 2
-
-    def output(self, modes: List[int]) -> int:
-        value = self.fetch(self.program[self.ptr + 1], modes[0])
-        self.ptr += 2
-        return value
-
-    def true_jump(self, modes: List[int]) -> None:
-        if self.fetch(self.program[self.ptr + 1], modes[0]) == 0:
-            self.ptr += 3
-        else:
-            self.ptr = self.fetch(self.program[self.ptr + 2], modes[1])
-
-    def false_jump(self, modes: List[int]) -> None:
-        if self.fetch(self.program[self.ptr + 1], modes[0]) > 0:
-            self.ptr += 3
-        else:
-            self.ptr = self.fetch(self.program[self.ptr + 2], modes[1])
-
-    def less_than(self, modes: List[int]) -> None:
-        p1 = self.fetch(self.program[self.ptr + 1], modes[0])
-        p2 = self.fetch(self.program[self.ptr + 2], modes[1])
-        self.write(self.program[self.ptr + 3], 1 if p1 < p2 else 0, modes[2])
-        self.ptr += 4
-
-    def equals(self, modes: List[int]) -> None:
-        p1 = self.fetch(self.program[self.ptr + 1], modes[0])
-        p2 = self.fetch(self.program[self.ptr + 2], modes[1])
-        self.write(self.program[self.ptr + 3], 1 if p1 == p2 else 0, modes[2])
-        self.ptr += 4
-
-    def offset_relative(self, modes: List[int]) -> None:
-        parameter = self.fetch(self.program[self.ptr + 1], modes[0])
-        self.relative_base += parameter
-        self.ptr += 2
+    def draw(self, grid: ndarray, dirty: Set[Cell], score: int) -> None:
+        # only tiles that changed since the last frame
+        for i, j in dirty:
+            self.screen.addch(i, j, self.graphics[grid[i, j]])
+        self.screen.addstr(0, grid.shape[1] + 5, f"SCORE: {score}")
+        self.screen.refresh()
 
-    def run(self):
-        while self.ptr < len(self.program):
-            op, modes = self.parse_instruction(str(self.program[self.ptr]))
-            if op == self.halt:
-                break
+    def read(self, grid: ndarray) -> str:
+        self.screen.addstr(grid.shape[0] + 5, 0, "CONTROL")
+        self.screen.refresh()
+        return chr(self.screen.getch())
 
-            if op == 3:
-                yield "INP"
-                self.ops[op](self.inputs.pop(0), modes)
-            elif op == 4:
-                yield self.ops[op](modes)
-            else:
-                self.ops[op](modes)
+
+class HeadlessScreen:
+    def __init__(self, controller: Optional[Callable[[ndarray], str]] = None):
+        # controller(grid) -> control key, keeps the paddle still by default
+        self.controller = controller
+        self.frames = None
+        self.scores = []
+
+    def open(self, grid: ndarray) -> None:
+        self.frames = zeros((64,) + grid.shape, dtype=grid.dtype)
+        self.scores = []
+        self.draw(grid, set(), 0)
+
+    def close(self) -> None:
+        pass
+
+    def draw(self, grid: ndarray, dirty: Set[Cell], score: int) -> None:
+        count = len(self.scores)
+        if count == len(self.frames):
+            self.frames = concatenate([self.frames, zeros_like(self.frames)])
+        self.frames[count] = grid
+        self.scores.append(score)
+
+    def read(self, grid: ndarray) -> str:
+        return "j" if self.controller is None else self.controller(grid)
+
+    @property
+    def recorded(self) -> ndarray:
+        return self.frames[:len(self.scores)]
 
 
 class Arcanoid:
-    def __init__(self, amp: AMP):
+    def __init__(self, amp: AMP, screen=None, fps: float = 30):
         self.amp = amp
         self.grid_size = (21, 44)
         self.grid = zeros(self.grid_size, dtype="uint8")
 
         self.graphics = {0: ".", 1: "W", 2: "B", 3: "=", 4: "O"}
         self.controls = {"h": -1, "j": 0, "k": 1}
+        self.screen = CursesScreen(self.graphics) if screen is None else screen
+        # at most `fps` frames a second while the game runs on its own,
+        # always one before waiting for input
+        self.fps = fps
+        self.dirty: Set[Cell] = set()
+
+    def save(self, path: str) -> None:
+        # a `Tracer` wraps the VM
+        amp = getattr(self.amp, "amp", self.amp)
+        snapshot(amp, path, grid=self.grid.ravel())
+
+    @classmethod
+    def load(
+        cls, path: str, engine: type = AMP, screen=None,
+    ) -> "Arcanoid":
+        amp, attached = restore(path, engine)
+        arcanoid = cls(amp, screen)
+        grid = frombuffer(attached["grid"], dtype="int64")
+        arcanoid.grid[:] = grid.reshape(arcanoid.grid_size)
+        return arcanoid
+
+    def render(self, score: int) -> None:
+        self.screen.draw(self.grid, self.dirty, score)
+        self.dirty = set()
 
     def run(self):
         game_runner = self.amp.run()
-        screen = curses.initscr()
-        curses.curs_set(0)
+        self.screen.open(self.grid)
+        interval = 1 / self.fps if self.fps else 0
+        drawn = perf_counter()
 
         responses = []
-        score = 0
+        score = shown = 0
         playing = True
         while playing:
-            screen.clear()
-            self._draw_grid(screen)
-            screen.addstr(0, self.grid_size[1] + 5, f"SCORE: {score}")
-            screen.refresh()
-
-            if len(responses) == 3:
-                x, y, tile = responses
-                responses.clear()
-
-                if x == -1 and y == 0:
-                    score = tile
-                    continue
-                self.grid[y, x] = tile
-
             try:
                 response = next(game_runner)
             except StopIteration:
@@ -145,49 +121,90 @@ class Arcanoid:
 
             if response != "INP":
                 responses.append(response)
-                continue
+                if len(responses) < 3:
+                    continue
+                x, y, tile = responses
+                responses.clear()
 
-            screen.clear()
-            self._draw_grid(screen)
-            screen.addstr(0, self.grid_size[1] + 5, f"SCORE: {score}")
-            screen.addstr(self.grid_size[0] + 5, 0, "CONTROL")
-            screen.refresh()
+                if x == -1 and y == 0:
+                    score = tile
+                elif self.grid[y, x] != tile:
+                    self.grid[y, x] = tile
+                    self.dirty.add((y, x))
+                if self.dirty or score != shown:
+                    now = perf_counter()
+                    if now - drawn >= interval:
+                        self.render(score)
+                        drawn, shown = now, score
+                continue
 
-            control = self._input(screen)
+            self.render(score)
+            drawn, shown = perf_counter(), score
+            control = self.screen.read(self.grid)
             if control == "q":
                 playing = False
                 continue
             elif control == "s":
-                with open("day13.arc.pkl", "wb") as f:
-                    dump(self, f)
+                self.save("day13.arc.snap")
                 continue
             self.amp.inputs.append(self.controls[control])
 
-        curses.endwin()
+        self.render(score)
+        self.screen.close()
         return score
 
-    def _draw_grid(self, screen) -> None:
-        for i in range(self.grid_size[0]):
-            for j in range(self.grid_size[1]):
-                screen.addch(i, j, self.graphics[self.grid[i, j]])
-
-    def _input(self, screen) -> str:
-        return chr(screen.getch())
-
 
-def main():
-    memory = list(zeros(10000, dtype="int32"))
+def autopilot(amp: AMP) -> Tuple[int, float]:
+    # plays until the game halts by keeping the paddle under the ball,
+    # (final score, seconds)
+    ball = paddle = score = 0
+    responses = []
+    start = perf_counter()
+    for response in amp.run():
+        if response == "INP":
+            amp.inputs.append((ball > paddle) - (ball < paddle))
+            continue
+        responses.append(response)
+        if len(responses) == 3:
+            x, y, tile = responses
+            responses.clear()
+            if x == -1 and y == 0:
+                score = tile
+            elif tile == 4:
+                ball = x
+            elif tile == 3:
+                paddle = x
+    return score, perf_counter() - start
+
+
+def main(
+    engine: type = AMP, trace: Optional[str] = None, headless: bool = False,
+    autopiloted: bool = False,
+):
     with open("day13.txt") as f:
         program = list(map(lambda x: int(x), f.readline().strip().split(",")))
-    memory[:len(program)] = program
+    memory = Memory(program)
     memory[0] = 2
 
-    amp = AMP(deepcopy(memory))
-    arcanoid = Arcanoid(amp)
-    # with open("day13.arc.pkl", "rb") as f:
-    #     arcanoid = load(f)
+    amp = engine(memory)
+    if autopiloted:
+        score, seconds = autopilot(amp)
+        print(f"Final score: {score}")
+        steps = getattr(amp, "steps", None)
+        if steps is not None:
+            print(f"{steps} instructions, {steps / seconds:.0f}/s")
+        return
+    if trace is not None:
+        # the last steps end up in `trace`, see `intcode_trace.Trace.open`
+        from intcode import Tracer
+        amp = Tracer(amp, path=trace)
+    screen = HeadlessScreen() if headless else None
+    arcanoid = Arcanoid(amp, screen)
+    # arcanoid = Arcanoid.load("day13.arc.snap")
     score = arcanoid.run()
     print(f"Final score: {score}")
+    if headless:
+        print(f"{len(screen.scores)} frames")
 
 
 if __name__ == "__main__":
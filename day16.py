@@ -1,20 +1,200 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from os import cpu_count
+from typing import Iterator, Optional, Tuple
+
+from numpy import (
+    add, arange, array, cumsum, frombuffer, int32, int64, memmap, minimum,
+    ndarray, repeat, uint8, zeros,
+)
 from tqdm import tqdm
 
+# weight of the prefix sum at the m-th block boundary of a pattern, by m % 4
+WEIGHTS = array([-1, -1, 1, 1])
+# digits or block boundaries handled at once, bounds the temporaries
+CHUNK = 1 << 20
+
+# worker state, set once per process by `initialize`
+worker_memory = []
+worker_prefix = None
+worker_output = None
+
+
+def boundaries(length: int, first: int, last: int) -> ndarray:
+    # number of block boundaries for the digits first, ..., last - 1
+    # the sums of the blocks starting past the end are 0 and skipped
+    repeats = arange(first + 1, last + 1)
+    return (length + repeats) // repeats // 2 * 2
+
+
+def allocate(
+    length: int, path: Optional[str] = None, dtype: type = uint8,
+) -> ndarray:
+    if path is None:
+        return zeros(length, dtype=dtype)
+    return memmap(path, dtype=dtype, mode="w+", shape=(length,))
+
+
+def expand(
+    base: str, times: int, start: int = 0, path: Optional[str] = None,
+) -> ndarray:
+    # `base` repeated `times` from `start` on, filled a chunk at a time
+    digits = frombuffer(base.encode(), dtype=uint8) - ord("0")
+    signal = allocate(len(base) * times - start, path)
+    for begin in range(0, len(signal), CHUNK):
+        end = min(begin + CHUNK, len(signal))
+        positions = arange(start + begin, start + end) % len(base)
+        signal[begin:end] = digits[positions]
+    return signal
+
+
+def ranges(length: int) -> Iterator[Tuple[int, int]]:
+    # (first, last) digits with at most a chunk of block boundaries, the
+    # first digit has the most, a digit with more than that is a range of
+    # its own
+    first = 0
+    while first < length:
+        most = int(boundaries(length, first, first + 1)[0])
+        last = min(first + max(CHUNK // most, 1), length)
+        yield first, last
+        first = last
+
+
+def prefix_type(length: int) -> type:
+    return int32 if 9 * length < 1 << 31 else int64
+
+
+def digits(prefix: ndarray, output: ndarray, first: int, last: int) -> None:
+    # digit i sums the blocks of its pattern, (i + 1) apart and starting at
+    # (i + 1) * m - 1, every block sum is the difference of two prefix sums
+    length = len(prefix) - 1
+    sizes = boundaries(length, first, last)
+    if sizes[0] > CHUNK:
+        # alone in its range, its boundaries are summed a chunk at a time
+        count, total = int(sizes[0]), 0
+        for begin in range(1, count + 1, CHUNK):
+            m = arange(begin, min(begin + CHUNK, count + 1))
+            terms = prefix[minimum((first + 1) * m - 1, length)]
+            total += int((terms * WEIGHTS[m % 4]).sum())
+        output[first] = abs(total) % 10
+        return
+    starts = cumsum(sizes) - sizes
+    total = int(sizes.sum())
+    repeats = repeat(arange(first + 1, last + 1), sizes)
+    m = arange(1, total + 1) - repeat(starts, sizes)
+    terms = prefix[minimum(repeats * m - 1, length)] * WEIGHTS[m % 4]
+    output[first:last] = abs(add.reduceat(terms, starts)) % 10
+
+
+def phase(signal: ndarray, output: ndarray, prefix: ndarray) -> ndarray:
+    # `prefix` is scratch space for the length + 1 prefix sums
+    length = len(signal)
+    prefix[0] = 0
+    cumsum(signal, dtype=prefix.dtype, out=prefix[1:])
+    for first, last in ranges(length):
+        digits(prefix, output, first, last)
+    return output
+
+
+def attach(
+    name: str, dtype: type, length: int,
+) -> Tuple[SharedMemory, ndarray]:
+    memory = SharedMemory(name)
+    return memory, ndarray(length, dtype=dtype, buffer=memory.buf)
+
+
+def initialize(prefix: str, output: str, length: int, dtype: type) -> None:
+    global worker_memory, worker_prefix, worker_output
+    prefix_memory, worker_prefix = attach(prefix, dtype, length + 1)
+    output_memory, worker_output = attach(output, uint8, length)
+    worker_memory = [prefix_memory, output_memory]
+
+
+def compute(bounds: Tuple[int, int]) -> None:
+    digits(worker_prefix, worker_output, *bounds)
+
+
+def parallel_phases(signal: ndarray, phases: int, workers: int) -> ndarray:
+    # in place, the parent sums up the prefixes, the workers fill in the
+    # digits of the next signal, both through shared memory
+    length = len(signal)
+    dtype = prefix_type(length)
+    prefix_memory = SharedMemory(
+        create=True, size=(length + 1) * dtype().itemsize,
+    )
+    output_memory = SharedMemory(create=True, size=max(length, 1))
+    prefix = ndarray(length + 1, dtype=dtype, buffer=prefix_memory.buf)
+    output = ndarray(length, dtype=uint8, buffer=output_memory.buf)
+    try:
+        output[:] = signal
+        prefix[0] = 0
+        executor = ProcessPoolExecutor(
+            workers, initializer=initialize,
+            initargs=(prefix_memory.name, output_memory.name, length, dtype),
+        )
+        with executor:
+            for _ in tqdm(range(phases)):
+                cumsum(output, dtype=dtype, out=prefix[1:])
+                # ranges get smaller towards the end, many more of them
+                # than workers keep the load even
+                for _ in executor.map(compute, ranges(length)):
+                    pass
+        signal[:] = output
+    finally:
+        # the views have to go before the memory can be closed
+        del prefix, output
+        for memory in (prefix_memory, output_memory):
+            memory.close()
+            memory.unlink()
+    return signal
+
+
+def tail_phase(tail: ndarray) -> ndarray:
+    # past the middle of the signal the pattern of a digit is 0 before it
+    # and 1 from there on, so its new value is the sum of the rest
+    # in place, chunks from the end carrying the sum of what follows them
+    carry = 0
+    end = len(tail)
+    while end > 0:
+        begin = max(end - CHUNK, 0)
+        sums = cumsum(tail[begin:end][::-1], dtype=int32) + carry
+        carry = int(sums[-1]) % 10
+        tail[begin:end] = (sums % 10)[::-1]
+        end = begin
+    return tail
 
-def gen(repeat: int, length: int, offset: int) -> int:
-    for i in range((repeat - 1) + offset * repeat, length + 1, 4 * repeat):
-        for j in range(i, min(i + repeat, length)):
-            yield j
 
+def fft(
+    base: str, times: int = 1, phases: int = 100, offset: int = 0,
+    path: Optional[str] = None, workers: Optional[int] = 1,
+) -> ndarray:
+    # the signal from `offset` on after `phases`, `path` maps the buffers
+    # (the signal, the next one and the prefix sums) to files instead of
+    # keeping them in memory, leaving temporaries of a few chunks
+    # more than one of `workers` (None for all cores) splits the digits of
+    # every phase among processes, they share the prefix sums and the next
+    # signal in memory, which grows with the signal, `path` or not
+    # the tail is a single linear pass per phase and stays in this one
+    length = len(base) * times
+    if 2 * offset >= length:
+        # the digits before `offset` don't matter for the ones after it
+        signal = expand(base, times, offset, path)
+        for _ in tqdm(range(phases)):
+            tail_phase(signal)
+        return signal
 
-def fftop(signal: list) -> list:
-    return [
-        abs(
-            sum(signal[one_id] for one_id in gen(i + 1, len(signal), 0))
-            - sum(signal[one_id] for one_id in gen(i + 1, len(signal), 2))
-        ) % 10
-        for i in tqdm(range(len(signal)))
-    ]
+    signal = expand(base, times, 0, path)
+    workers = workers or cpu_count()
+    if workers > 1:
+        return parallel_phases(signal, phases, workers)[offset:]
+    output = allocate(length, None if path is None else f"{path}.next")
+    prefix = allocate(
+        length + 1, None if path is None else f"{path}.prefix",
+        prefix_type(length),
+    )
+    for _ in tqdm(range(phases)):
+        signal, output = phase(signal, output, prefix), signal
+    return signal[offset:]
 
 
 def main():
@@ -29,14 +209,12 @@ def main():
         "832056716364642980573035884242786534497497819370142341197572200114719"
         "501961903139039062180801786440041641226652928704955476667007810579293"
         "19060171363468213087408071790"
-    ) * 10_000
-    # signal_raw = "03036732577212944063491565474664" * 10_000
+    )
+    # signal_raw = "03036732577212944063491565474664"
     offset = int(signal_raw[:7])
 
-    signal = list(map(lambda x: int(x), signal_raw))
-    for i in tqdm(range(100)):
-        signal = fftop(signal)
-    print("".join(map(lambda x: str(x), signal[offset:offset + 8])))
+    signal = fft(signal_raw, 10_000, 100, offset)
+    print("".join(map(lambda x: str(x), signal[:8])))
 
 
 if __name__ == "__main__":
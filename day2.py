@@ -1,43 +1,55 @@
-def mod_op(opcode: list, noun: int, verb: int) -> list:
-    opcode[1] = noun
-    opcode[2] = verb
-    return opcode
+from functools import partial
 
+from numpy import arange, flatnonzero
 
-def test(opcode: list):
-    add = 1
-    mul = 2
-    halt = 99
-    for i in range(0, len(opcode), 4):
-        if opcode[i] == halt:
-            break
-        if opcode[i] == add:
-            opcode[opcode[i + 3]] = opcode[opcode[i + 1]] + opcode[opcode[i + 2]]
-        elif opcode[i] == mul:
-            opcode[opcode[i + 3]] = opcode[opcode[i + 1]] * opcode[opcode[i + 2]]
-        else:
-            break
+from intcode_batch import BatchAMP
+from intcode_sweep import run, search
 
-    return opcode
 
+def first_cell(memory, outputs) -> int:
+    return memory[0]
 
-if __name__ == "__main__":
-    # test([1, 0, 0, 0, 99])
-    # test([2, 3, 0, 3, 99])
-    # test([2, 4, 4, 5, 99, 0])
-    # test([1, 1, 1, 4, 99, 5, 6, 0, 99])
 
+def batched_search(opcode: list, target: int):
+    # every noun/verb pair is its own instance, all run in lockstep
+    pairs = arange(100 * 100)
+    batch = BatchAMP(opcode, pairs.size)
+    batch.memory[:, 1] = pairs // 100
+    batch.memory[:, 2] = pairs % 100
+    batch.run()
+
+    found = flatnonzero(batch.memory[:, 0] == target)
+    if found.size:
+        return divmod(int(found[0]), 100)
+    return None
+
+
+def parallel_search(opcode: list, target: int):
+    # noun/verb pairs are spread over worker processes, stops at first hit
+    points = (
+        ({1: noun, 2: verb}, ()) for noun in range(100) for verb in range(100)
+    )
+    task = partial(run, objective=first_cell)
+    found = search(opcode, points, lambda value: value == target, task)
+    if found is not None:
+        (patch, _), _ = found
+        return patch[1], patch[2]
+    return None
+
+
+def main(parallel: bool = False):
     target = 19690720
     input_opcode = [1,0,0,3,1,1,2,3,1,3,4,3,1,5,0,3,2,1,6,19,1,19,5,23,2,13,23,27,1,10,27,31,2,6,31,35,1,9,35,39,2,10,39,43,1,43,9,47,1,47,9,51,2,10,51,55,1,55,9,59,1,59,5,63,1,63,6,67,2,6,67,71,2,10,71,75,1,75,5,79,1,9,79,83,2,83,10,87,1,87,6,91,1,13,91,95,2,10,95,99,1,99,6,103,2,13,103,107,1,107,2,111,1,111,9,0,99,2,14,0,0]
-    found = False
-    for noun in range(100):
-        if found:
-            break
-
-        for verb in range(100):
-            result = test(mod_op(input_opcode[:], noun, verb))
-            if result[0] == target:
-                print(f"noun: {noun}, verb: {verb}")
-                print(f"answer: {100 * noun + verb}")
-                found = True
-                break
+    if parallel:
+        found = parallel_search(input_opcode, target)
+    else:
+        found = batched_search(input_opcode, target)
+
+    if found is not None:
+        noun, verb = found
+        print(f"noun: {noun}, verb: {verb}")
+        print(f"answer: {100 * noun + verb}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,743 @@
+"""
+Intcode execution engines.
+
+AMP:
+    reference interpreter, dispatches every instruction through `ops`
+    and caches decoded instructions per address until it is written to.
+    `run` is a generator yielding "INP" before taking a value from
+    `inputs` and every output.
+ThreadedAMP:
+    instead of dispatching through `AMP.ops` and branching on the parameter
+    modes of every instruction, each (operation, modes) combination met at
+    runtime is compiled once into a closure with its addressing baked in,
+    e.g. 21101 becomes "add immediate, immediate, relative".
+    Compiled closures are bound to the addresses they were decoded at and
+    dropped as soon as that address is written to.
+    An instruction touching memory outside of the program image, or
+    storing a value that doesn't fit into it, is redone through the
+    slower, but complete, `Memory` interface.
+JitAMP:
+    runs cold code through the ThreadedAMP handlers while counting how
+    often every address is executed. Once an address gets hot, the
+    straight-line run of instructions starting there (up to and including
+    a jump, or up to I/O and halt) is translated to Python source with all
+    parameters inlined and compiled into a single function.
+    Writing to any byte of a compiled block throws it away and its
+    addresses go back to the interpreter.
+Memory:
+    program image is kept in a dense list, everything past it lives in a
+    sparse map of pages allocated on the first write, so startup cost and
+    footprint follow what the program touches. Writes right behind the
+    image (e.g. a stack) grow it in place instead.
+    Untouched cells read as 0, length is the highest written address + 1,
+    or the end of the image if that is further out.
+    With a `typecode` (e.g. "q") cells are stored in int64 `array`s, which
+    are several times smaller but slower to index than lists. Values are
+    still computed as Python ints, storing one that doesn't fit promotes
+    the whole memory to lists, the engines recompile against them.
+CowMemory:
+    same interface, but the image is split into pages too, so `fork`
+    only copies the page table and both sides copy a page on their first
+    write to it. Meant for cloning VMs, engines run slower on it as they
+    have no dense image to index.
+Pipeline:
+    chain of VMs following the generator protocol of `AMP.run`
+    ("INP" before taking an input, then every output), each one's outputs
+    appended to the input deque of the next. A VM runs until it blocks
+    on an empty input or halts, only VMs with pending input get scheduled
+    again, so no one polls and all of it stays on one thread.
+
+Engines with heavier dependencies (`BatchAMP` needs NumPy, `AsyncAMP`,
+`sweep` and `search`), the `Profiler`, the `Tracer`, snapshots, the
+static `analyze`r and the `fuse` and `accelerate` passes live in their own
+modules and are imported from here on first use only.
+
+Handlers and blocks take the instruction pointer and return the next one,
+input handlers additionally take the value to store,
+output handlers return `(next pointer, value)`.
+"""
+from array import array
+from collections import deque
+from functools import lru_cache
+from importlib import import_module
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+Handler = Callable[..., int]
+Modes = Tuple[int, int, int]
+
+BASE = "vm.relative_base"
+
+
+def read(mode: int, parameter: str, base: str = BASE) -> str:
+    if mode == 0:
+        return f"mem[{parameter}]"
+    elif mode == 2:
+        return f"mem[{base} + {parameter}]"
+    return parameter
+
+
+def target(mode: int, parameter: str, base: str = BASE) -> Optional[str]:
+    if mode == 0:
+        return parameter
+    elif mode == 2:
+        return f"{base} + {parameter}"
+    # writes in immediate mode are ignored, same as `AMP.write`
+    return None
+
+
+def store(address: Optional[str], value: str, leave: str = "") -> str:
+    if address is None:
+        return ""
+    return (
+        f"address = {address}\n"
+        f"mem[address] = {value}\n"
+        "if address in guard:\n"
+        "    vm.invalidate(address)\n"
+        + "".join(f"    {line}\n" for line in leave.splitlines())
+    )
+
+
+def expression(operation: int, a: str, b: str) -> str:
+    if operation == 1:
+        return f"{a} + {b}"
+    elif operation == 2:
+        return f"{a} * {b}"
+    elif operation == 7:
+        return f"1 if {a} < {b} else 0"
+    return f"1 if {a} == {b} else 0"
+
+
+def jump(
+    operation: int, condition: str, destination: str, fallthrough: str,
+) -> str:
+    if operation == 5:
+        return f"{fallthrough} if {condition} == 0 else {destination}"
+    return f"{fallthrough} if {condition} > 0 else {destination}"
+
+
+def decode(instruction: int) -> Tuple[int, Modes]:
+    # (operation, parameter modes)
+    operation = instruction % 100
+    modes = (
+        instruction // 100 % 10,
+        instruction // 1000 % 10,
+        instruction // 10000 % 10,
+    )
+    return operation, modes
+
+
+@lru_cache(maxsize=4096)
+def factory(source: str, name: str) -> Callable:
+    # compiled sources are shared by all VMs, only closures are per VM
+    namespace = {}
+    exec(compile(source, name, "exec"), namespace)
+    return namespace["make"]
+
+
+def build(source: str, name: str, *closure) -> Callable:
+    return factory(source, name)(*closure)
+
+
+@lru_cache(maxsize=None)
+def handler_source(instruction: int) -> str:
+    operation, m = decode(instruction)
+    p = [f"mem[ptr + {i}]" for i in range(4)]
+    if operation in (1, 2, 7, 8):
+        value = expression(operation, read(m[0], p[1]), read(m[1], p[2]))
+        body = store(target(m[2], p[3]), value) + "return ptr + 4\n"
+    elif operation == 3:
+        body = store(target(m[0], p[1]), "value") + "return ptr + 2\n"
+    elif operation == 4:
+        body = f"return ptr + 2, {read(m[0], p[1])}\n"
+    elif operation in (5, 6):
+        body = "return " + jump(
+            operation, read(m[0], p[1]), read(m[1], p[2]), "ptr + 3",
+        ) + "\n"
+    elif operation == 9:
+        body = f"{BASE} += {read(m[0], p[1])}\nreturn ptr + 2\n"
+    else:
+        raise KeyError(operation)
+
+    arguments = "ptr, value" if operation == 3 else "ptr"
+    return (
+        "def make(mem, vm, guard):\n"
+        f"    def handler({arguments}):\n"
+        + "".join(f"        {line}\n" for line in body.splitlines())
+        + "    return handler\n"
+    )
+
+
+class Memory:
+    def __init__(
+        self, program: List[int], page_size: int = 256,
+        typecode: Optional[str] = None,
+    ):
+        self.typecode = typecode
+        self.image = self.allocate(program)
+        self.dense = len(self.image)
+        self.size = self.dense
+        self.page_size = page_size
+        self.pages: Dict[int, List[int]] = {}
+
+    def allocate(self, values: List[int]) -> List[int]:
+        values = [int(value) for value in values]
+        if self.typecode is not None:
+            try:
+                return array(self.typecode, values)
+            except OverflowError:
+                self.typecode = None
+        return values
+
+    def promote(self) -> None:
+        # a value didn't fit into the typed arrays, continue with Python ints
+        self.typecode = None
+        self.image = list(self.image)
+        self.pages = {index: list(page) for index, page in self.pages.items()}
+
+    def __len__(self) -> int:
+        # the image counts as a whole once it grew to a page boundary,
+        # the engines write into it directly and halt past `len`
+        return max(self.size, self.dense)
+
+    def __getitem__(self, address: int) -> int:
+        if 0 <= address < self.dense:
+            return self.image[address]
+        elif address < 0:
+            raise IndexError(f"negative address {address}")
+        page = self.pages.get(address // self.page_size)
+        return 0 if page is None else page[address % self.page_size]
+
+    def __setitem__(self, address: int, value: int) -> None:
+        try:
+            self.store(address, value)
+        except OverflowError:
+            self.promote()
+            self.store(address, value)
+
+    def store(self, address: int, value: int) -> None:
+        if 0 <= address < self.dense:
+            self.image[address] = value
+            return
+        elif address < 0:
+            raise IndexError(f"negative address {address}")
+        if address < self.dense + self.page_size:
+            self.grow(address)
+            self.image[address] = value
+        else:
+            page = self.pages.get(address // self.page_size)
+            if page is None:
+                page = self.allocate([0] * self.page_size)
+                self.pages[address // self.page_size] = page
+            page[address % self.page_size] = value
+        if address >= self.size:
+            self.size = address + 1
+
+    def grow(self, address: int) -> None:
+        # extend the image in place up to the page holding `address`,
+        # engines keep references to it
+        dense = (address // self.page_size + 1) * self.page_size
+        self.image.extend(self[i] for i in range(self.dense, dense))
+        first, last = self.dense // self.page_size, dense // self.page_size
+        for index in range(first, last):
+            self.pages.pop(index, None)
+        self.dense = dense
+
+
+class CowMemory:
+    def __init__(self, program: List[int], page_size: int = 64):
+        self.page_size = page_size
+        self.size = len(program)
+        self.pages: Dict[int, List[int]] = {}
+        for start in range(0, len(program), page_size):
+            page = [int(value) for value in program[start:start + page_size]]
+            page.extend([0] * (page_size - len(page)))
+            self.pages[start // page_size] = page
+        # pages this instance may write to in place, the rest is shared
+        self.owned = set(self.pages)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, address: int) -> int:
+        if address < 0:
+            raise IndexError(f"negative address {address}")
+        page = self.pages.get(address // self.page_size)
+        return 0 if page is None else page[address % self.page_size]
+
+    def __setitem__(self, address: int, value: int) -> None:
+        if address < 0:
+            raise IndexError(f"negative address {address}")
+        index = address // self.page_size
+        if index not in self.owned:
+            page = self.pages.get(index)
+            self.pages[index] = (
+                [0] * self.page_size if page is None else page[:]
+            )
+            self.owned.add(index)
+        self.pages[index][address % self.page_size] = value
+        if address >= self.size:
+            self.size = address + 1
+
+    def fork(self) -> "CowMemory":
+        clone = CowMemory.__new__(CowMemory)
+        clone.page_size = self.page_size
+        clone.size = self.size
+        clone.pages = self.pages.copy()
+        clone.owned = set()
+        # pages are shared from now on, both sides copy before writing
+        self.owned = set()
+        return clone
+
+
+class AMP:
+    def __init__(self, program: List[int]):
+        self.halt = 99
+        self.ops = {
+            1: self.addition, 2: self.multiplication,
+            3: self.receive, 4: self.output,
+            5: self.true_jump, 6: self.false_jump,
+            7: self.less_than, 8: self.equals,
+            9: self.offset_relative,
+        }
+
+        self.ptr = 0
+        self.relative_base = 0
+        self.program = program
+        # address -> (operation, modes, handler), dropped on write
+        self.decoded = {}
+        # instructions dispatched by `run`, counted once it returns or
+        # is closed, a superinstruction counts as one
+        self.steps = 0
+        # address -> cells of the superinstruction covering it, see
+        # `intcode_fuse`
+        self.fused: Dict[int, range] = {}
+        self.inputs = deque()
+
+    def fork(self) -> "AMP":
+        # needs `CowMemory`, clones share its pages until they write
+        clone = AMP(self.program.fork())
+        clone.ptr = self.ptr
+        clone.relative_base = self.relative_base
+        clone.inputs = deque(self.inputs)
+        return clone
+
+    def decode(self, address: int) -> Tuple[int, Modes, Callable]:
+        operation, modes = decode(self.program[address])
+        decoded = operation, modes, self.ops.get(operation)
+        self.decoded[address] = decoded
+        return decoded
+
+    def fetch(self, parameter: int, mode: int) -> int:
+        if mode == 0:
+            return self.program[parameter]
+        elif mode == 2:
+            return self.program[self.relative_base + parameter]
+        return parameter
+
+    def write(self, parameter: int, value: int, mode: int) -> None:
+        if mode == 0:
+            address = parameter
+        elif mode == 2:
+            address = self.relative_base + parameter
+        else:
+            return
+        self.program[address] = value
+        self.decoded.pop(address, None)
+        if address in self.fused:
+            self.defuse(self.fused[address])
+
+    def defuse(self, cells: range) -> None:
+        # back to decoding the instructions one by one
+        for address in cells:
+            self.fused.pop(address, None)
+        self.decoded.pop(cells.start, None)
+
+    def addition(self, modes: Modes) -> None:
+        ad1 = self.fetch(self.program[self.ptr + 1], modes[0])
+        ad2 = self.fetch(self.program[self.ptr + 2], modes[1])
+        self.write(self.program[self.ptr + 3], ad1 + ad2, modes[2])
+        self.ptr += 4
+
+    def multiplication(self, modes: Modes) -> None:
+        ad1 = self.fetch(self.program[self.ptr + 1], modes[0])
+        ad2 = self.fetch(self.program[self.ptr + 2], modes[1])
+        self.write(self.program[self.ptr + 3], ad1 * ad2, modes[2])
+        self.ptr += 4
+
+    def receive(self, value: int, modes: Modes) -> None:
+        self.write(self.program[self.ptr + 1], value, modes[0])
+        self.ptr += 2
+
+    def output(self, modes: Modes) -> int:
+        value = self.fetch(self.program[self.ptr + 1], modes[0])
+        self.ptr += 2
+        return value
+
+    def true_jump(self, modes: Modes) -> None:
+        if self.fetch(self.program[self.ptr + 1], modes[0]) == 0:
+            self.ptr += 3
+        else:
+            self.ptr = self.fetch(self.program[self.ptr + 2], modes[1])
+
+    def false_jump(self, modes: Modes) -> None:
+        if self.fetch(self.program[self.ptr + 1], modes[0]) > 0:
+            self.ptr += 3
+        else:
+            self.ptr = self.fetch(self.program[self.ptr + 2], modes[1])
+
+    def less_than(self, modes: Modes) -> None:
+        p1 = self.fetch(self.program[self.ptr + 1], modes[0])
+        p2 = self.fetch(self.program[self.ptr + 2], modes[1])
+        self.write(self.program[self.ptr + 3], 1 if p1 < p2 else 0, modes[2])
+        self.ptr += 4
+
+    def equals(self, modes: Modes) -> None:
+        p1 = self.fetch(self.program[self.ptr + 1], modes[0])
+        p2 = self.fetch(self.program[self.ptr + 2], modes[1])
+        self.write(self.program[self.ptr + 3], 1 if p1 == p2 else 0, modes[2])
+        self.ptr += 4
+
+    def offset_relative(self, modes: Modes) -> None:
+        parameter = self.fetch(self.program[self.ptr + 1], modes[0])
+        self.relative_base += parameter
+        self.ptr += 2
+
+    def run(self):
+        decoded = self.decoded
+        steps = 0
+        try:
+            while self.ptr < len(self.program):
+                op, modes, handler = (
+                    decoded.get(self.ptr) or self.decode(self.ptr)
+                )
+                if op == self.halt:
+                    break
+                steps += 1
+
+                if op == 3:
+                    yield "INP"
+                    handler(self.inputs.popleft(), modes)
+                elif op == 4:
+                    yield handler(modes)
+                else:
+                    handler(modes)
+        finally:
+            self.steps += steps
+
+
+class ThreadedAMP:
+    def __init__(self, program: List[int]):
+        self.halt = 99
+        self.ptr = 0
+        self.relative_base = 0
+        self.program = program
+        # handlers index the dense image directly and fall back to
+        # `program` only for addresses outside of it
+        self.image = getattr(program, "image", program)
+        self.inputs = deque()
+        # instruction -> specialized handler
+        self.handlers: Dict[int, Handler] = {}
+        self.safe_handlers: Dict[int, Handler] = {}
+        # address -> handler, only for non-I/O instructions
+        self.code: Dict[int, Handler] = {}
+        # addresses whose writes have to call `invalidate`
+        self.guard = self.code
+
+    def __getstate__(self) -> dict:
+        # compiled closures can't be pickled, they are rebuilt on demand
+        state = self.__dict__.copy()
+        state["handlers"], state["safe_handlers"] = {}, {}
+        state["code"] = {}
+        state["guard"] = state["code"]
+        return state
+
+    def handler(self, instruction: int, safe: bool = False) -> Handler:
+        handlers = self.safe_handlers if safe else self.handlers
+        handler = handlers.get(instruction)
+        if handler is None:
+            handler = build(
+                handler_source(instruction), f"<intcode {instruction}>",
+                self.program if safe else self.image, self, self.guard,
+            )
+            handlers[instruction] = handler
+        return handler
+
+    def sync(self) -> None:
+        image = getattr(self.program, "image", self.program)
+        if image is not self.image:
+            self.image = image
+            self.rebind()
+
+    def rebind(self) -> None:
+        # memory switched its storage, drop everything compiled against
+        # the old one, containers are shared with the closures
+        self.handlers.clear()
+        self.code.clear()
+
+    def step(self, ptr: int) -> int:
+        ptr = self.handler(self.program[ptr], safe=True)(ptr)
+        self.sync()
+        return ptr
+
+    def fault(self, ptr: int) -> int:
+        # handlers don't write before all of their reads succeeded,
+        # so a failed instruction can be redone through `Memory`
+        image, dense = self.image, len(self.image)
+        following = self.step(ptr)
+        if self.image is image and len(image) == dense:
+            # it works outside of the dense image, keep it that way
+            self.code[ptr] = self.handler(self.program[ptr], safe=True)
+        return following
+
+    def invalidate(self, address: int) -> None:
+        del self.code[address]
+
+    def execute(self, ptr: int, instruction: int) -> int:
+        self.code[ptr] = self.handler(instruction)
+        return self.step(ptr)
+
+    def run(self):
+        code = self.code
+        while True:
+            ptr = self.ptr
+            handler = code.get(ptr)
+            try:
+                while handler is not None:
+                    ptr = handler(ptr)
+                    handler = code.get(ptr)
+            except (IndexError, OverflowError):
+                self.ptr = self.fault(ptr)
+                continue
+            self.ptr = ptr
+
+            if ptr >= len(self.program):
+                break
+            instruction = self.program[ptr]
+            op = instruction % 100
+            if op == self.halt:
+                break
+
+            if op == 3:
+                yield "INP"
+                self.ptr = self.handler(instruction, safe=True)(
+                    ptr, self.inputs.popleft(),
+                )
+                self.sync()
+            elif op == 4:
+                self.ptr, value = self.handler(instruction, safe=True)(ptr)
+                yield value
+            else:
+                self.ptr = self.execute(ptr, instruction)
+
+
+class JitAMP(ThreadedAMP):
+    def __init__(self, program: List[int], threshold: int = 64):
+        super().__init__(program)
+        self.threshold = threshold
+        self.max_block = 256
+        # address -> number of interpreted executions
+        self.heat: Dict[int, int] = {}
+        # block start -> addresses it was compiled from
+        self.spans: Dict[int, range] = {}
+        self.guard: Dict[int, List[int]] = {}
+
+    def __getstate__(self) -> dict:
+        state = super().__getstate__()
+        state["guard"], state["spans"] = {}, {}
+        return state
+
+    def rebind(self) -> None:
+        super().rebind()
+        self.guard.clear()
+        self.spans.clear()
+        self.heat.clear()
+
+    def invalidate(self, address: int) -> None:
+        for start in self.guard.pop(address, ()):
+            self.code.pop(start, None)
+            self.heat.pop(start, None)
+            for covered in self.spans.pop(start, ()):
+                starts = self.guard.get(covered)
+                if starts and start in starts:
+                    starts.remove(start)
+
+    def execute(self, ptr: int, instruction: int) -> int:
+        hits = self.heat.get(ptr, 0) + 1
+        self.heat[ptr] = hits
+        if hits >= self.threshold:
+            block = self.compile_block(ptr)
+            if block is not None:
+                return block(ptr)
+        return self.step(ptr)
+
+    def block_source(self, start: int) -> Optional[str]:
+        program = self.program
+        lines = []
+        uses_base = False
+        ptr = start
+        terminated = False
+        while ptr - start < self.max_block and not terminated:
+            if ptr + 3 >= len(program):
+                break
+            operation, m = decode(program[ptr])
+            p = [str(int(program[ptr + i])) for i in range(4)]
+            leave = "vm.relative_base = rb\n" if uses_base else ""
+            if operation in (1, 2, 7, 8):
+                value = expression(
+                    operation, read(m[0], p[1], "rb"), read(m[1], p[2], "rb"),
+                )
+                body = store(
+                    target(m[2], p[3], "rb"), value,
+                    leave + f"return {ptr + 4}",
+                )
+                size = 4
+            elif operation == 9:
+                uses_base = True
+                body = f"rb += {read(m[0], p[1], 'rb')}\n"
+                size = 2
+            elif operation in (5, 6):
+                destination = jump(
+                    operation, read(m[0], p[1], "rb"),
+                    read(m[1], p[2], "rb"), str(ptr + 3),
+                )
+                body = leave + f"return {destination}\n"
+                size = 3
+                terminated = True
+            else:
+                # I/O, halt and garbage are left to the interpreter
+                break
+            lines.append(f"at = {ptr}\n" + body)
+            ptr += size
+
+        if ptr == start:
+            return None
+        if not terminated:
+            leave = "vm.relative_base = rb\n" if uses_base else ""
+            lines.append(leave + f"return {ptr}\n")
+        self.spans[start] = range(start, ptr)
+        # blocks work on the dense image only, the instruction that runs
+        # out of it or overflows it is redone through `Memory` and the
+        # block is left
+        return (
+            "def make(mem, vm, guard):\n"
+            "    def block(ptr):\n"
+            "        rb = vm.relative_base\n"
+            "        try:\n"
+            + "".join(
+                f"            {line}\n"
+                for line in "".join(lines).splitlines()
+            )
+            + "        except (IndexError, OverflowError):\n"
+            "            vm.relative_base = rb\n"
+            "            return vm.step(at)\n"
+            "    return block\n"
+        )
+
+    def compile_block(self, start: int) -> Optional[Handler]:
+        source = self.block_source(start)
+        if source is None:
+            return None
+        block = build(
+            source, f"<intcode block {start}>", self.image, self, self.guard,
+        )
+        for address in self.spans[start]:
+            self.guard.setdefault(address, []).append(start)
+        self.code[start] = block
+        return block
+
+
+class Pipeline:
+    def __init__(self, amps: List, feedback: bool = True):
+        self.amps = amps
+        # amp i writes into the inputs of amp i + 1, the last one back
+        # into the first with feedback, otherwise into `outputs`
+        self.outputs = deque()
+        self.targets = [amp.inputs for amp in amps[1:]]
+        self.targets.append(amps[0].inputs if feedback else self.outputs)
+        self.runners: List[Optional[Iterator]] = [amp.run() for amp in amps]
+        # last value the final amp produced, e.g. the thrust
+        self.last = None
+
+    def resume(self, i: int) -> None:
+        # until amp i blocks on an empty input or halts
+        inputs, target = self.amps[i].inputs, self.targets[i]
+        for value in self.runners[i]:
+            if value == "INP":
+                if not inputs:
+                    return
+            else:
+                target.append(value)
+                if i == len(self.amps) - 1:
+                    self.last = value
+        self.runners[i] = None
+
+    def run(self) -> Optional[int]:
+        # until every amp halted or waits for an input nobody will send
+        count = len(self.amps)
+        runnable = deque(range(count))
+        scheduled = set(runnable)
+        while runnable:
+            i = runnable.popleft()
+            scheduled.discard(i)
+            if self.runners[i] is not None:
+                self.resume(i)
+            # whatever amp i produced can unblock the next one
+            following = (i + 1) % count
+            if (
+                following not in scheduled
+                and self.runners[following] is not None
+                and self.amps[following].inputs
+            ):
+                runnable.append(following)
+                scheduled.add(following)
+        return self.last
+
+
+# name -> module, see `__getattr__`
+LAZY = {
+    "BatchAMP": "intcode_batch",
+    "AsyncAMP": "intcode_async",
+    "Profiler": "intcode_profile",
+    "Trace": "intcode_trace",
+    "Tracer": "intcode_trace",
+    "snapshot": "intcode_snapshot",
+    "restore": "intcode_snapshot",
+    "analyze": "intcode_cfg",
+    "fuse": "intcode_fuse",
+    "accelerate": "intcode_loops",
+    "sweep": "intcode_sweep",
+    "search": "intcode_sweep",
+}
+
+
+def __getattr__(name: str):
+    module = LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module), name)
+
+
+# stores `104, 42, 99` behind itself and jumps there, the cells are past
+# the program, but inside the image `Memory` grew for the first store
+GROWN_CODE = [
+    1101, 0, 0, 20, 1101, 104, 0, 30, 1101, 42, 0, 31, 1101, 99, 0, 32,
+    1105, 1, 30,
+]
+
+
+def main():
+    # self checks, every engine on every kind of memory
+    for engine in (AMP, ThreadedAMP, JitAMP):
+        memories = (
+            GROWN_CODE + [0] * 16, Memory(GROWN_CODE),
+            Memory(GROWN_CODE, typecode="q"), CowMemory(GROWN_CODE, 4),
+        )
+        for memory in memories:
+            outputs = [v for v in engine(memory).run() if v != "INP"]
+            name = f"{engine.__name__} on {type(memory).__name__}"
+            assert outputs == [42], f"{name}: {outputs} instead of [42]"
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
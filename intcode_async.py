@@ -0,0 +1,66 @@
+"""
+Intcode on asyncio.
+
+`AsyncAMP` runs the `ThreadedAMP` handlers as a coroutine: input awaits
+`inputs`, output awaits `outputs`, both `asyncio.Queue`s, so VMs are wired
+into a network by sharing queues and need no "INP" handshake.
+Every `quantum` dispatched handlers the VM hands control back to the event
+loop, so compute bound VMs can't starve the others.
+"""
+from asyncio import Queue, sleep
+from typing import List, Optional
+
+from intcode import ThreadedAMP
+
+
+class AsyncAMP(ThreadedAMP):
+    def __init__(
+        self, program: List[int], inputs: Optional[Queue] = None,
+        outputs: Optional[Queue] = None, quantum: int = 1000,
+    ):
+        super().__init__(program)
+        self.inputs = Queue() if inputs is None else inputs
+        self.outputs = Queue() if outputs is None else outputs
+        self.quantum = quantum
+
+    async def run(self) -> None:
+        code = self.code
+        budget = self.quantum
+        while True:
+            if budget <= 0:
+                budget = self.quantum
+                await sleep(0)
+
+            ptr = self.ptr
+            handler = code.get(ptr)
+            try:
+                while handler is not None and budget > 0:
+                    ptr = handler(ptr)
+                    handler = code.get(ptr)
+                    budget -= 1
+            except (IndexError, OverflowError):
+                self.ptr = self.fault(ptr)
+                budget -= 1
+                continue
+            self.ptr = ptr
+            if handler is not None:
+                # out of budget, not out of compiled code
+                continue
+
+            if ptr >= len(self.program):
+                break
+            instruction = self.program[ptr]
+            op = instruction % 100
+            if op == self.halt:
+                break
+
+            if op == 3:
+                value = await self.inputs.get()
+                self.ptr = self.handler(instruction, safe=True)(ptr, value)
+                self.sync()
+            elif op == 4:
+                self.ptr, value = self.handler(instruction, safe=True)(ptr)
+                await self.outputs.put(value)
+            else:
+                self.ptr = self.execute(ptr, instruction)
+            budget -= 1
@@ -0,0 +1,177 @@
+"""
+Lockstep execution of many Intcode instances of the same program.
+
+Memory of N instances is an (N, M) int64 matrix, every instance has its own
+instruction pointer and relative base. Each step decodes the current
+instruction of all live instances at once and executes every operation
+present as a handful of NumPy operations over the instances running it.
+
+Unlike `AMP` the memory doesn't grow, addresses are limited to M and
+arithmetic wraps around at int64. An instance running into an unknown
+operation or an address outside of its memory is marked as crashed and
+stops, the rest of the batch carries on.
+"""
+from collections import deque
+from typing import Iterable, List, Optional
+
+from numpy import array, ndarray, flatnonzero, full, unique, where, zeros
+
+from intcode import decode
+
+SIZES = {1: 4, 2: 4, 3: 2, 4: 2, 5: 3, 6: 3, 7: 4, 8: 4, 9: 2}
+
+
+class BatchAMP:
+    def __init__(
+        self, program: List[int], instances: int, size: Optional[int] = None,
+    ):
+        self.halt = 99
+        self.size = max(size or 0, len(program))
+        self.memory = zeros((instances, self.size), dtype="int64")
+        self.memory[:, :len(program)] = program
+
+        self.ptr = zeros(instances, dtype="int64")
+        self.relative_base = zeros(instances, dtype="int64")
+        self.halted = full(instances, False)
+        self.crashed = full(instances, False)
+        self.waiting = full(instances, False)
+        self.inputs = [deque() for _ in range(instances)]
+        self.outputs = [[] for _ in range(instances)]
+
+    def feed(self, values: Iterable[int]) -> None:
+        # one value per instance
+        for queue, value in zip(self.inputs, values):
+            queue.append(int(value))
+        self.waiting[:] = False
+
+    def run(self) -> None:
+        # until every instance halted or waits for input
+        while self.step():
+            pass
+
+    def step(self) -> bool:
+        live = flatnonzero(~self.halted & ~self.waiting)
+        if live.size == 0:
+            return False
+
+        # running off the end halts, same as `AMP.run`
+        ptr = self.ptr[live]
+        self.halted[live[ptr >= self.size]] = True
+        self.crash(live[ptr < 0])
+        live = live[(ptr >= 0) & (ptr < self.size)]
+
+        # in lockstep most instances sit on the same instruction, grouping
+        # by it rather than by operation keeps the modes scalar
+        flat = live * self.size + self.ptr[live]
+        instructions = self.memory.reshape(-1)[flat]
+        if instructions.size and instructions.min() == instructions.max():
+            self.execute(int(instructions[0]), live)
+        else:
+            for instruction in unique(instructions):
+                self.execute(
+                    int(instruction), live[instructions == instruction],
+                )
+        return True
+
+    def crash(self, rows: ndarray) -> None:
+        self.crashed[rows] = True
+        self.halted[rows] = True
+
+    def execute(self, instruction: int, rows: ndarray) -> None:
+        operation, modes = decode(instruction)
+        if operation == self.halt:
+            self.halted[rows] = True
+            return
+        elif operation not in SIZES:
+            self.crash(rows)
+            return
+
+        inside = self.ptr[rows] + SIZES[operation] <= self.size
+        if not inside.all():
+            self.crash(rows[~inside])
+            rows = rows[inside]
+        ptr = self.ptr[rows]
+        # flat indices are cheaper to gather than (row, column) pairs
+        memory = self.memory.reshape(-1)
+        origin = rows * self.size
+        bad = None
+
+        def address(k: int) -> ndarray:
+            nonlocal bad
+            address = memory[origin + ptr + k]
+            if modes[k - 1] == 2:
+                address += self.relative_base[rows]
+            if address.min() < 0 or address.max() >= self.size:
+                outside = (address < 0) | (address >= self.size)
+                bad = outside if bad is None else bad | outside
+                address = address.clip(0, self.size - 1)
+            return address
+
+        def operand(k: int) -> ndarray:
+            if modes[k - 1] == 1:
+                return memory[origin + ptr + k]
+            return memory[origin + address(k)]
+
+        def write(k: int, values: ndarray, mask: ndarray = None) -> None:
+            # immediate mode writes are ignored, same as `AMP.write`
+            if modes[k - 1] == 1:
+                return
+            target = address(k)
+            if bad is not None:
+                mask = ~bad if mask is None else mask & ~bad
+            if mask is None:
+                memory[origin + target] = values
+            else:
+                memory[(origin + target)[mask]] = values[mask]
+
+        if operation in (1, 2, 7, 8):
+            a, b = operand(1), operand(2)
+            if operation == 1:
+                result = a + b
+            elif operation == 2:
+                result = a * b
+            elif operation == 7:
+                result = (a < b).astype("int64")
+            else:
+                result = (a == b).astype("int64")
+            write(3, result)
+            following = ptr + 4
+        elif operation == 3:
+            if modes[0] != 1:
+                address(1)
+            queued = [bool(self.inputs[row]) for row in rows]
+            ready = array(queued, dtype=bool)
+            if bad is not None:
+                ready &= ~bad
+                self.waiting[rows[~bad & ~ready]] = True
+            else:
+                self.waiting[rows[~ready]] = True
+            values = zeros(rows.size, dtype="int64")
+            for i in flatnonzero(ready):
+                values[i] = self.inputs[rows[i]].popleft()
+            write(1, values, ready)
+            following = where(ready, ptr + 2, ptr)
+        elif operation == 4:
+            values = operand(1)
+            for i in range(rows.size) if bad is None else flatnonzero(~bad):
+                self.outputs[rows[i]].append(int(values[i]))
+            following = ptr + 2
+        elif operation in (5, 6):
+            condition, destination = operand(1), operand(2)
+            if operation == 5:
+                skip = condition == 0
+            else:
+                skip = condition > 0
+            following = where(skip, ptr + 3, destination)
+        else:
+            offset = operand(1)
+            if bad is not None:
+                offset = where(bad, 0, offset)
+            self.relative_base[rows] += offset
+            following = ptr + 2
+
+        if bad is None:
+            self.ptr[rows] = following
+        else:
+            self.ptr[rows[~bad]] = following[~bad]
+            self.crash(rows[bad])
@@ -0,0 +1,268 @@
+"""
+Static control flow analysis of Intcode programs.
+
+Code and data share the memory, so instead of a linear sweep the program
+is disassembled by following control flow from address 0: fall through,
+and jumps (5/6) whose target is an immediate. A target read from memory or
+relative to the base can't be resolved statically, the block ends with an
+indirect jump. Programs with indirect jumps (calls and returns through the
+stack) additionally get every immediate operand of an arithmetic or compare
+instruction that lands on a valid instruction inside the program as an
+entry point, that is where return addresses come from.
+
+Basic blocks start at entry points, jump targets and after jumps, they end
+after a jump, at halt or at anything that doesn't decode.
+A write is self-modifying if its position-mode target is part of a
+disassembled instruction, relative-mode writes are only counted.
+
+`analyze` caches its result as JSON in `cache`, keyed by a hash of the
+program, so analysing the same program again is a file read.
+"""
+import json
+import os
+import sys
+from hashlib import sha256
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+# `decode` here decodes a whole instruction at an address
+from intcode import decode as decode_instruction
+
+VERSION = 1
+CACHE = os.path.join(os.path.expanduser("~"), ".cache", "intcode")
+
+SIZES = {1: 4, 2: 4, 3: 2, 4: 2, 5: 3, 6: 3, 7: 4, 8: 4, 9: 2, 99: 1}
+# operation -> parameter written
+WRITES = {1: 3, 2: 3, 3: 1, 7: 3, 8: 3}
+
+
+class Instruction(NamedTuple):
+    address: int
+    operation: int
+    modes: Tuple[int, int, int]
+    parameters: Tuple[int, ...]
+
+    @property
+    def end(self) -> int:
+        return self.address + 1 + len(self.parameters)
+
+
+class Block(NamedTuple):
+    start: int
+    # address after the last instruction
+    end: int
+    successors: Tuple[int, ...]
+    # ends with a jump whose target is only known at runtime
+    indirect: bool
+
+
+class CFG(NamedTuple):
+    instructions: Dict[int, Instruction]
+    blocks: Dict[int, Block]
+    entries: Set[int]
+    # (writing instruction, written address)
+    self_modifying: List[Tuple[int, int]]
+    relative_writes: int
+
+
+def decode(program: List[int], address: int) -> Optional[Instruction]:
+    if not 0 <= address < len(program):
+        return None
+    instruction = program[address]
+    operation, modes = decode_instruction(instruction)
+    size = SIZES.get(operation)
+    if instruction < 0 or size is None or address + size > len(program):
+        return None
+    if any(mode > 2 for mode in modes):
+        return None
+    parameters = tuple(program[address + 1:address + size])
+    return Instruction(address, operation, modes, parameters)
+
+
+def successors(instruction: Instruction) -> Tuple[Tuple[int, ...], bool]:
+    # (statically known successors, whether there is an indirect one)
+    operation, modes = instruction.operation, instruction.modes
+    if operation == 99:
+        return (), False
+    elif operation not in (5, 6):
+        return (instruction.end,), False
+
+    condition, destination = instruction.parameters
+    following = (instruction.end,)
+    if modes[0] == 1:
+        # same rules as `AMP.true_jump` and `AMP.false_jump`
+        taken = condition != 0 if operation == 5 else condition <= 0
+        if not taken:
+            return following, False
+        following = ()
+    if modes[1] == 1:
+        return following + (destination,), False
+    return following, True
+
+
+def disassemble(
+    program: List[int], entries: Set[int],
+) -> Tuple[Dict[int, Instruction], Set[int], bool]:
+    # (instructions, jump targets and fall throughs after jumps, indirect)
+    instructions: Dict[int, Instruction] = {}
+    leaders = set(entries)
+    indirect = False
+    pending = list(entries)
+    while pending:
+        address = pending.pop()
+        while address not in instructions:
+            instruction = decode(program, address)
+            if instruction is None:
+                break
+            instructions[address] = instruction
+            following, unknown = successors(instruction)
+            indirect |= unknown
+            if instruction.operation in (5, 6):
+                leaders.update(following)
+                pending.extend(following)
+                break
+            elif not following:
+                break
+            address = following[0]
+    return instructions, leaders, indirect
+
+
+def address_taken(
+    program: List[int], instructions: Dict[int, Instruction],
+) -> Set[int]:
+    constants = set()
+    for instruction in instructions.values():
+        if instruction.operation not in (1, 2, 7, 8):
+            continue
+        for mode, parameter in zip(instruction.modes, instruction.parameters):
+            if mode == 1 and decode(program, parameter) is not None:
+                constants.add(parameter)
+    return constants
+
+
+def build(program: List[int]) -> CFG:
+    entries = {0}
+    instructions, leaders, indirect = disassemble(program, entries)
+    while indirect:
+        taken = address_taken(program, instructions) - entries
+        if not taken:
+            break
+        entries |= taken
+        instructions, leaders, indirect = disassemble(program, entries)
+
+    blocks = {}
+    for start in sorted(leaders):
+        if start not in instructions:
+            continue
+        address = start
+        while True:
+            instruction = instructions[address]
+            following, unknown = successors(instruction)
+            end = instruction.end
+            if (
+                instruction.operation in (5, 6, 99)
+                or end in leaders or end not in instructions
+            ):
+                break
+            address = end
+        if instruction.operation not in (5, 6, 99) and end not in instructions:
+            # runs into something that doesn't decode
+            following = ()
+        blocks[start] = Block(start, end, following, unknown)
+
+    # cells that are part of an instruction -> that instruction
+    code = {}
+    for instruction in instructions.values():
+        for cell in range(instruction.address, instruction.end):
+            code[cell] = instruction.address
+    self_modifying = []
+    relative_writes = 0
+    for instruction in instructions.values():
+        written = WRITES.get(instruction.operation)
+        if written is None:
+            continue
+        mode = instruction.modes[written - 1]
+        target = instruction.parameters[written - 1]
+        if mode == 2:
+            relative_writes += 1
+        elif mode == 0 and target in code:
+            self_modifying.append((instruction.address, target))
+    self_modifying.sort()
+    return CFG(instructions, blocks, entries, self_modifying, relative_writes)
+
+
+def digest(program: List[int]) -> str:
+    text = f"{VERSION}:" + ",".join(map(str, program))
+    return sha256(text.encode()).hexdigest()
+
+
+def dumps(cfg: CFG) -> str:
+    return json.dumps({
+        "instructions": [
+            [i.address, i.operation, i.modes, i.parameters]
+            for i in cfg.instructions.values()
+        ],
+        "blocks": [list(block) for block in cfg.blocks.values()],
+        "entries": sorted(cfg.entries),
+        "self_modifying": cfg.self_modifying,
+        "relative_writes": cfg.relative_writes,
+    })
+
+
+def loads(text: str) -> CFG:
+    data = json.loads(text)
+    instructions = {}
+    for address, operation, modes, parameters in data["instructions"]:
+        instructions[address] = Instruction(
+            address, operation, tuple(modes), tuple(parameters),
+        )
+    blocks = {}
+    for start, end, following, indirect in data["blocks"]:
+        blocks[start] = Block(start, end, tuple(following), indirect)
+    return CFG(
+        instructions, blocks, set(data["entries"]),
+        [tuple(pair) for pair in data["self_modifying"]],
+        data["relative_writes"],
+    )
+
+
+def analyze(program: List[int], cache: Optional[str] = CACHE) -> CFG:
+    if cache is None:
+        return build(program)
+    path = os.path.join(cache, f"{digest(program)}.json")
+    try:
+        with open(path) as f:
+            return loads(f.read())
+    except (OSError, ValueError, KeyError):
+        pass
+
+    cfg = build(program)
+    # other processes may analyse the same program at the same time
+    temporary = f"{path}.{os.getpid()}"
+    try:
+        os.makedirs(cache, exist_ok=True)
+        with open(temporary, "w") as f:
+            f.write(dumps(cfg))
+        os.replace(temporary, path)
+    except OSError:
+        # a cache we can't write to only costs the next run its time
+        pass
+    return cfg
+
+
+def main():
+    for name in sys.argv[1:]:
+        with open(name) as f:
+            program = list(map(lambda x: int(x), f.readline().strip().split(",")))
+        cfg = analyze(program)
+        indirect = sum(block.indirect for block in cfg.blocks.values())
+        covered = sum(i.end - i.address for i in cfg.instructions.values())
+        print(
+            f"{name}: {len(cfg.instructions)} instructions "
+            f"({covered}/{len(program)} cells), {len(cfg.blocks)} blocks, "
+            f"{indirect} indirect, {len(cfg.self_modifying)} "
+            f"self-modifying writes, {cfg.relative_writes} relative writes"
+        )
+
+
+if __name__ == "__main__":
+    main()
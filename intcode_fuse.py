@@ -0,0 +1,144 @@
+"""
+Superinstructions for `AMP`.
+
+`fuse(amp)` looks for pairs of adjacent instructions in the code found by
+`intcode_cfg.analyze` and replaces the first one's entry in `amp.decoded`
+by a handler doing the work of both in one dispatch:
+
+compare and branch:
+    `7`/`8` writing a flag, then `5`/`6` testing that same flag, e.g.
+    1008 x, y, flag + 1005 flag, target
+adjust and jump:
+    `9`, then a jump that is always taken, the usual function return
+    109 -n + 2106 0, 0
+store and jump:
+    `1`/`2`, then a jump that is always taken, the usual call pushing its
+    return address
+    21101 ret, 0, 0 + 1106 0, function
+
+Parameters are baked into the handlers, so the whole pair is guarded:
+writing to any of its cells drops the superinstruction (`AMP.defuse`) and
+the VM goes back to decoding both instructions separately. A jump into the
+second instruction of a pair just runs that instruction alone.
+
+Run the pass once memory is set up, as writes that bypass `AMP.write` aren't
+seen by the guard. `Profiler` and `Tracer` count a superinstruction as a
+single step of its own kind, don't fuse VMs you trace.
+"""
+from typing import Callable, Dict, Optional, Tuple
+
+from intcode import AMP, Modes
+from intcode_cfg import CFG, Instruction, analyze
+
+# operation codes of superinstructions, outside of the real ones
+COMPARE_BRANCH, ADJUST_JUMP, STORE_JUMP = 100, 101, 102
+
+
+def always_taken(jump: Instruction) -> bool:
+    condition = jump.parameters[0]
+    if jump.modes[0] != 1:
+        return False
+    # same rules as `AMP.true_jump` and `AMP.false_jump`
+    return condition != 0 if jump.operation == 5 else condition <= 0
+
+
+def compare_branch(
+    amp: AMP, compare: Instruction, branch: Instruction,
+) -> Optional[Callable]:
+    m1, m2, m3 = compare.modes
+    p1, p2, p3 = compare.parameters
+    condition, destination = branch.parameters
+    if m3 == 1 or branch.modes[0] != m3 or condition != p3:
+        return None
+    less = compare.operation == 7
+    true = branch.operation == 5
+    mode = branch.modes[1]
+    start, end = compare.address, branch.end
+    cells = range(start, end)
+
+    def handler(modes: Modes) -> None:
+        a, b = amp.fetch(p1, m1), amp.fetch(p2, m2)
+        flag = (1 if a < b else 0) if less else (1 if a == b else 0)
+        address = p3 + amp.relative_base if m3 == 2 else p3
+        amp.write(p3, flag, m3)
+        if address in cells:
+            # wrote to itself, the branch has to be decoded again
+            amp.ptr = branch.address
+        elif (flag != 0) if true else (flag <= 0):
+            amp.ptr = amp.fetch(destination, mode)
+        else:
+            amp.ptr = end
+    return handler
+
+
+def adjust_jump(
+    amp: AMP, adjust: Instruction, jump: Instruction,
+) -> Optional[Callable]:
+    if not always_taken(jump):
+        return None
+    offset, mode = adjust.parameters[0], adjust.modes[0]
+    destination, destination_mode = jump.parameters[1], jump.modes[1]
+
+    def handler(modes: Modes) -> None:
+        amp.relative_base += amp.fetch(offset, mode)
+        amp.ptr = amp.fetch(destination, destination_mode)
+    return handler
+
+
+def store_jump(
+    amp: AMP, store: Instruction, jump: Instruction,
+) -> Optional[Callable]:
+    if not always_taken(jump):
+        return None
+    m1, m2, m3 = store.modes
+    p1, p2, p3 = store.parameters
+    add = store.operation == 1
+    destination, mode = jump.parameters[1], jump.modes[1]
+    cells = range(store.address, jump.end)
+
+    def handler(modes: Modes) -> None:
+        a, b = amp.fetch(p1, m1), amp.fetch(p2, m2)
+        address = p3 + amp.relative_base if m3 == 2 else p3
+        amp.write(p3, a + b if add else a * b, m3)
+        if m3 != 1 and address in cells:
+            amp.ptr = jump.address
+        else:
+            amp.ptr = amp.fetch(destination, mode)
+    return handler
+
+
+# first operation -> (kind, factory), the second one is always a jump
+PATTERNS: Dict[int, Tuple[int, Callable]] = {
+    1: (STORE_JUMP, store_jump), 2: (STORE_JUMP, store_jump),
+    7: (COMPARE_BRANCH, compare_branch), 8: (COMPARE_BRANCH, compare_branch),
+    9: (ADJUST_JUMP, adjust_jump),
+}
+
+
+def fuse(amp: AMP, cfg: Optional[CFG] = None) -> int:
+    # number of superinstructions installed
+    if cfg is None:
+        program = amp.program
+        cfg = analyze([program[i] for i in range(len(program))])
+
+    fused = 0
+    for first in cfg.instructions.values():
+        second = cfg.instructions.get(first.end)
+        pattern = PATTERNS.get(first.operation)
+        if pattern is None or second is None:
+            continue
+        elif second.operation not in (5, 6):
+            continue
+        kind, factory = pattern
+        handler = factory(amp, first, second)
+        if handler is None:
+            continue
+
+        cells = range(first.address, second.end)
+        if any(address in amp.fused for address in cells):
+            continue
+        amp.decoded[first.address] = kind, first.modes, handler
+        for address in cells:
+            amp.fused[address] = cells
+        fused += 1
+    return fused
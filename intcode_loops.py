@@ -0,0 +1,207 @@
+"""
+Closed form execution of counting loops for `AMP`.
+
+`accelerate(amp)` looks for basic blocks that jump back to their own start
+(see `intcode_cfg`) and consist of nothing but additions and compares, e.g.
+
+    1001 i, 1, i        i += 1
+    1007 i, 100, flag   flag = i < 100
+    1005 flag, start
+
+and installs a handler at the loop start. Whenever the loop is entered it
+resolves the addresses with the current relative base and checks that
+
+    every addition is `x = x + c` with `c` an immediate or a cell the loop
+    doesn't write, so each `x` grows by the same amount every iteration,
+    compares read only those counters, immediates and such invariant cells,
+    and the branch tests a compare's flag or a counter,
+    no cell is written twice and nothing is written into the loop itself.
+
+Every value in the loop is then a linear function of the iteration, the
+iteration the branch first falls through is solved for directly, and the
+counters and flags are set to their values after it. Anything else, e.g. a
+loop that would never end or I/O in the body (which doesn't even get a
+handler), is interpreted as usual.
+
+The loop is guarded like a superinstruction, writing to its cells removes
+the handler (`AMP.defuse`).
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+from intcode import AMP, Modes
+from intcode_cfg import CFG, Block, Instruction, analyze
+
+LOOP = 103
+# value of iteration k: a + b * k
+Linear = Tuple[int, int]
+
+
+def first_exit(value: Linear, exits: str) -> Optional[int]:
+    # smallest k >= 0 at which `value` satisfies `exits`, None if never
+    a, b = value
+    if exits == "eq0":
+        if b == 0:
+            return 0 if a == 0 else None
+        return -a // b if -a % b == 0 and -a // b >= 0 else None
+    elif exits == "ne0":
+        if a != 0:
+            return 0
+        return 1 if b != 0 else None
+    elif exits == "gt0":
+        if a > 0:
+            return 0
+        return -a // b + 1 if b > 0 else None
+    if a <= 0:
+        return 0
+    return -(-a // -b) if b < 0 else None
+
+
+class Loop:
+    def __init__(self, amp: AMP, block: Block, body: List[Instruction]):
+        self.amp = amp
+        self.start, self.end = block.start, block.end
+        self.body = body[:-1]
+        self.branch = body[-1]
+
+    def address(self, mode: int, parameter: int) -> int:
+        return parameter if mode == 0 else self.amp.relative_base + parameter
+
+    def target(self, instruction: Instruction) -> int:
+        return self.address(instruction.modes[2], instruction.parameters[2])
+
+    def run(self) -> bool:
+        # False if the loop can't be skipped, the VM is untouched then
+        amp, memory = self.amp, self.amp.program
+        cells = range(self.start, self.end)
+
+        writes: Dict[int, int] = {}
+        for i, instruction in enumerate(self.body):
+            if instruction.modes[2] == 1:
+                return False
+            address = self.target(instruction)
+            if address < 0 or address in cells or address in writes:
+                return False
+            writes[address] = i
+
+        def source(mode: int, parameter: int) -> Tuple[Optional[int], int]:
+            # (address or None for an immediate, value)
+            if mode == 1:
+                return None, parameter
+            address = self.address(mode, parameter)
+            return address, memory[address]
+
+        # address -> (index of the addition, start value, increment)
+        counters: Dict[int, Tuple[int, int, int]] = {}
+        for i, instruction in enumerate(self.body):
+            if instruction.operation != 1:
+                continue
+            target = self.target(instruction)
+            operands = [
+                source(mode, parameter) for mode, parameter
+                in zip(instruction.modes, instruction.parameters[:2])
+            ]
+            if operands[1][0] == target:
+                operands.reverse()
+            (counter, start), (other, increment) = operands
+            if counter != target or other in writes:
+                return False
+            counters[target] = i, start, increment
+
+        def value(mode: int, parameter: int, at: int) -> Optional[Linear]:
+            # at instruction `at` of iteration k
+            address, current = source(mode, parameter)
+            if address not in writes:
+                return current, 0
+            elif address not in counters:
+                return None
+            i, start, increment = counters[address]
+            done = 1 if i < at else 0
+            return start + increment * done, increment
+
+        # flag address -> (operation, difference of the operands)
+        flags: Dict[int, Tuple[int, Linear]] = {}
+        for i, instruction in enumerate(self.body):
+            if instruction.operation == 1:
+                continue
+            operands = [
+                value(mode, parameter, i) for mode, parameter
+                in zip(instruction.modes, instruction.parameters[:2])
+            ]
+            if None in operands:
+                return False
+            (a, da), (b, db) = operands
+            target = self.target(instruction)
+            flags[target] = instruction.operation, (b - a, db - da)
+
+        mode, parameter = self.branch.modes[0], self.branch.parameters[0]
+        true = self.branch.operation == 5
+        address, _ = source(mode, parameter)
+        if address in flags:
+            operation, difference = flags[address]
+            # flag of `7` is difference > 0, of `8` difference == 0
+            if operation == 7:
+                exits = "le0" if true else "gt0"
+            else:
+                exits = "ne0" if true else "eq0"
+        else:
+            difference = value(mode, parameter, len(self.body))
+            exits = "eq0" if true else "gt0"
+        k = first_exit(difference, exits)
+        if k is None:
+            return False
+
+        for address, (_, start, increment) in counters.items():
+            amp.write(address, start + increment * (k + 1), 0)
+        for address, (operation, (a, b)) in flags.items():
+            difference = a + b * k
+            if operation == 7:
+                flag = 1 if difference > 0 else 0
+            else:
+                flag = 1 if difference == 0 else 0
+            amp.write(address, flag, 0)
+        amp.ptr = self.end
+        return True
+
+
+def candidate(cfg: CFG, block: Block) -> Optional[List[Instruction]]:
+    if block.successors[-1:] != (block.start,) or block.indirect:
+        return None
+    body = []
+    address = block.start
+    while address < block.end:
+        instruction = cfg.instructions[address]
+        body.append(instruction)
+        address = instruction.end
+    if body[-1].operation not in (5, 6) or len(body) < 2:
+        return None
+    elif any(i.operation not in (1, 7, 8) for i in body[:-1]):
+        return None
+    return body
+
+
+def accelerate(amp: AMP, cfg: Optional[CFG] = None) -> int:
+    # number of loops installed
+    if cfg is None:
+        program = amp.program
+        cfg = analyze([program[i] for i in range(len(program))])
+
+    installed = 0
+    for block in cfg.blocks.values():
+        body = candidate(cfg, block)
+        cells = range(block.start, block.end)
+        if body is None or any(address in amp.fused for address in cells):
+            continue
+
+        loop = Loop(amp, block, body)
+        first = body[0]
+        interpret: Callable = amp.ops[first.operation]
+
+        def handler(modes: Modes, loop=loop, interpret=interpret) -> None:
+            if not loop.run():
+                interpret(modes)
+
+        amp.decoded[block.start] = LOOP, first.modes, handler
+        for address in cells:
+            amp.fused[address] = cells
+        installed += 1
+    return installed
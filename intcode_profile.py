@@ -0,0 +1,133 @@
+"""
+Opt-in execution profiler for `AMP`.
+
+`Profiler(amp).run()` is a drop-in for `amp.run()`, same generator protocol
+and same VM state, but every instruction is counted per operation, per
+address and per basic block, and the time spent in its handler is added to
+its operation. `AMP.run` itself is untouched, VMs nobody profiles pay
+nothing.
+
+A basic block starts at the first instruction executed and right after
+every jump, taken or not, and is identified by its start address. Time
+waiting for input isn't counted.
+"""
+import json
+from collections import Counter
+from time import perf_counter_ns
+from typing import Dict, List, Tuple
+
+from intcode import AMP
+
+NAMES = {
+    1: "add", 2: "mul", 3: "in", 4: "out", 5: "jnz",
+    6: "jz", 7: "lt", 8: "eq", 9: "arb",
+}
+CLASSES = {
+    1: "arithmetic", 2: "arithmetic", 3: "io", 4: "io", 5: "jump",
+    6: "jump", 7: "compare", 8: "compare", 9: "base",
+}
+
+
+class Profiler:
+    def __init__(self, amp: AMP):
+        self.amp = amp
+        self.operations = Counter()
+        self.addresses = Counter()
+        self.blocks = Counter()
+        # operation -> nanoseconds spent in its handler
+        self.times = Counter()
+
+    def run(self):
+        amp = self.amp
+        decoded = amp.decoded
+        operations, addresses = self.operations, self.addresses
+        blocks, times = self.blocks, self.times
+        leader = True
+        while amp.ptr < len(amp.program):
+            ptr = amp.ptr
+            op, modes, handler = decoded.get(ptr) or amp.decode(ptr)
+            if op == amp.halt:
+                break
+
+            operations[op] += 1
+            addresses[ptr] += 1
+            if leader:
+                blocks[ptr] += 1
+            leader = op == 5 or op == 6
+
+            if op == 3:
+                yield "INP"
+                value = amp.inputs.popleft()
+                start = perf_counter_ns()
+                handler(value, modes)
+                times[op] += perf_counter_ns() - start
+            elif op == 4:
+                start = perf_counter_ns()
+                value = handler(modes)
+                times[op] += perf_counter_ns() - start
+                yield value
+            else:
+                start = perf_counter_ns()
+                handler(modes)
+                times[op] += perf_counter_ns() - start
+
+    def classes(self) -> Dict[str, int]:
+        # operation class -> nanoseconds
+        times = Counter()
+        for op, elapsed in self.times.items():
+            times[CLASSES.get(op, str(op))] += elapsed
+        return dict(times)
+
+    def export(self, top: int = 0) -> dict:
+        # everything with `top` == 0, otherwise only the hottest entries
+        def hottest(counter: Counter) -> List[Tuple[int, int]]:
+            return counter.most_common(top or None)
+
+        return {
+            "instructions": sum(self.operations.values()),
+            "operations": {
+                NAMES.get(op, str(op)): {
+                    "count": count, "ns": self.times[op],
+                }
+                for op, count in hottest(self.operations)
+            },
+            "classes": self.classes(),
+            "addresses": hottest(self.addresses),
+            "blocks": hottest(self.blocks),
+        }
+
+    def dump(self, path: str, top: int = 0) -> None:
+        with open(path, "w") as f:
+            json.dump(self.export(top), f, indent=1)
+
+    def report(self, top: int = 10) -> str:
+        total = sum(self.operations.values()) or 1
+        elapsed = sum(self.times.values()) or 1
+        lines = [f"{sum(self.operations.values())} instructions"]
+
+        lines.append(f"{'operation':<10}{'count':>12}{'%':>7}{'ns/op':>9}")
+        for op, count in self.operations.most_common():
+            lines.append(
+                f"{NAMES.get(op, op):<10}{count:>12}"
+                f"{100 * count / total:>7.1f}"
+                f"{self.times[op] / count:>9.0f}"
+            )
+
+        lines.append(f"{'class':<10}{'ms':>12}{'%':>7}")
+        classes = sorted(self.classes().items(), key=lambda x: -x[1])
+        for name, ns in classes:
+            lines.append(
+                f"{name:<10}{ns / 1e6:>12.2f}{100 * ns / elapsed:>7.1f}"
+            )
+
+        for title, counter in (
+            ("address", self.addresses), ("block", self.blocks),
+        ):
+            entries = sum(counter.values()) or 1
+            lines.append(f"{title:<10}{'count':>12}{'%':>7}  instruction")
+            for address, count in counter.most_common(top):
+                lines.append(
+                    f"{address:<10}{count:>12}{100 * count / entries:>7.1f}"
+                    f"  {self.amp.program[address]}"
+                )
+        return "\n".join(lines)
@@ -0,0 +1,151 @@
+"""
+Binary snapshots of a VM.
+
+A snapshot stores pointer, relative base, memory and the pending inputs of
+an `AMP` (or any engine with the same state), plus named integer arrays
+the caller attaches, e.g. a game grid. Everything is int64, laid out as
+
+    header | segment table | attachment table | cells
+
+where every segment is a run of memory cells starting at some address:
+the whole list, the dense image and sparse pages of a `Memory`, or the
+pages of a `CowMemory`, which is restored as the same kind of memory.
+The snapshot is assembled in one buffer and written at once.
+
+`restore` maps the file instead of reading it. Memory is copied out of the
+mapping in bulk, attachments are returned as int64 memoryviews straight
+into it (private, so writing to them doesn't change the file), e.g. for
+`numpy.frombuffer`.
+"""
+from array import array
+from mmap import ACCESS_COPY, mmap
+from struct import Struct
+from typing import Dict, List, Sequence, Tuple
+
+from intcode import AMP, CowMemory, Memory
+
+MAGIC = b"ICSN"
+VERSION = 1
+HEADER = Struct("<4sHHqqqqqqq")
+SEGMENT = Struct("<qq")
+ATTACHMENT = Struct("<16sq")
+
+# kinds of memory
+LIST, MEMORY, TYPED_MEMORY, COW_MEMORY = range(4)
+
+
+def segments(memory) -> Tuple[int, int, List[Tuple[int, Sequence[int]]]]:
+    # (kind, page size, [(start, cells)])
+    if isinstance(memory, Memory):
+        kind = MEMORY if memory.typecode is None else TYPED_MEMORY
+        runs = [(0, memory.image)]
+    elif isinstance(memory, CowMemory):
+        kind, runs = COW_MEMORY, []
+    else:
+        return LIST, 0, [(0, memory)]
+    runs.extend(
+        (index * memory.page_size, page)
+        for index, page in sorted(memory.pages.items())
+    )
+    return kind, memory.page_size, runs
+
+
+def snapshot(amp: AMP, path: str, **attachments: Sequence[int]) -> None:
+    kind, page_size, runs = segments(amp.program)
+    names = [name.encode() for name in attachments]
+    if any(len(name) > ATTACHMENT.size - 8 for name in names):
+        raise ValueError("attachment names are limited to 16 bytes")
+
+    cells = array("q")
+    for _, run in runs:
+        cells.extend(run)
+    cells.extend(amp.inputs)
+    lengths = []
+    for values in attachments.values():
+        before = len(cells)
+        cells.extend(values)
+        lengths.append(len(cells) - before)
+
+    tables = HEADER.size + len(runs) * SEGMENT.size
+    tables += len(names) * ATTACHMENT.size
+    buffer = bytearray(tables + cells.itemsize * len(cells))
+    HEADER.pack_into(
+        buffer, 0, MAGIC, VERSION, kind, page_size, amp.ptr,
+        amp.relative_base, len(amp.program), len(runs), len(amp.inputs),
+        len(names),
+    )
+    offset = HEADER.size
+    for start, run in runs:
+        SEGMENT.pack_into(buffer, offset, start, len(run))
+        offset += SEGMENT.size
+    for name, length in zip(names, lengths):
+        ATTACHMENT.pack_into(buffer, offset, name, length)
+        offset += ATTACHMENT.size
+    buffer[tables:] = memoryview(cells).cast("B")
+
+    with open(path, "wb") as f:
+        f.write(buffer)
+
+
+def restore(
+    path: str, engine: type = AMP,
+) -> Tuple[AMP, Dict[str, memoryview]]:
+    with open(path, "rb") as f:
+        view = memoryview(mmap(f.fileno(), 0, access=ACCESS_COPY))
+    (
+        magic, version, kind, page_size, ptr, relative_base, size,
+        runs, inputs, attachments,
+    ) = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not an Intcode snapshot")
+    elif version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+
+    offset = HEADER.size
+    table = []
+    for _ in range(runs):
+        table.append(SEGMENT.unpack_from(view, offset))
+        offset += SEGMENT.size
+    names = []
+    for _ in range(attachments):
+        name, length = ATTACHMENT.unpack_from(view, offset)
+        names.append((name.rstrip(b"\0").decode(), length))
+        offset += ATTACHMENT.size
+    cells = view[offset:].cast("q")
+
+    position = 0
+    runs = []
+    for start, length in table:
+        run = cells[position:position + length]
+        if kind == TYPED_MEMORY:
+            typed = array("q")
+            typed.frombytes(run.cast("B"))
+            runs.append((start, typed))
+        else:
+            runs.append((start, run.tolist()))
+        position += length
+
+    if kind == LIST:
+        memory = runs[0][1] if runs else []
+    elif kind == COW_MEMORY:
+        memory = CowMemory([], page_size)
+        memory.pages = {start // page_size: run for start, run in runs}
+        memory.owned = set(memory.pages)
+    else:
+        memory = Memory([], page_size, "q" if kind == TYPED_MEMORY else None)
+        memory.image = runs[0][1]
+        memory.dense = len(memory.image)
+        memory.pages = {start // page_size: run for start, run in runs[1:]}
+    if kind != LIST:
+        memory.size = size
+
+    amp = engine(memory)
+    amp.ptr, amp.relative_base = ptr, relative_base
+    amp.inputs.extend(cells[position:position + inputs].tolist())
+    position += inputs
+
+    attached = {}
+    for name, length in names:
+        attached[name] = cells[position:position + length]
+        position += length
+    return amp, attached
@@ -0,0 +1,113 @@
+"""
+Parameter sweeps over an Intcode program on all cores.
+
+A point of the parameter space is a `(patch, inputs)` pair: memory cells to
+overwrite before the start and values for the input queue. Points are sent
+to a `ProcessPoolExecutor` in chunks, the program itself is shipped only
+once per worker through the pool initializer.
+
+`task(program, point)` runs in the workers and has to be picklable, i.e. a
+module level function or a `functools.partial` of one. The default `run`
+executes the point on a `ThreadedAMP` and hands memory and outputs to an
+optional `objective`, so only its (small) result travels back.
+A point crashing the VM evaluates to None.
+
+Leaving the `sweep` generator early, e.g. once `search` found its target,
+cancels the chunks still queued and tells running workers to stop.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from multiprocessing import Event
+from os import cpu_count
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from typing import Sequence, Tuple
+
+from intcode import Memory, ThreadedAMP
+
+Point = Tuple[Dict[int, int], Sequence[int]]
+
+# worker state, set once per process by `initialize`
+worker_program = None
+worker_task = None
+worker_stop = None
+
+
+def run(
+    program: List[int], point: Point, objective: Optional[Callable] = None,
+) -> Any:
+    patch, inputs = point
+    memory = Memory(program)
+    for address, value in patch.items():
+        memory[address] = value
+
+    amp = ThreadedAMP(memory)
+    amp.inputs.extend(inputs)
+    outputs = [output for output in amp.run() if output != "INP"]
+    if objective is None:
+        return memory, outputs
+    return objective(memory, outputs)
+
+
+def initialize(program: List[int], task: Callable, stop) -> None:
+    global worker_program, worker_task, worker_stop
+    worker_program, worker_task, worker_stop = program, task, stop
+
+
+def evaluate(points: List[Point]) -> List[Any]:
+    values = []
+    for point in points:
+        if worker_stop.is_set():
+            break
+        try:
+            values.append(worker_task(worker_program, point))
+        except (IndexError, KeyError):
+            # unknown operation, bad address or missing input
+            values.append(None)
+    return values
+
+
+def sweep(
+    program: List[int], points: Iterable[Point], task: Callable = run,
+    workers: Optional[int] = None, chunksize: int = 64,
+) -> Iterator[Tuple[Point, Any]]:
+    # yields (point, value) in completion order
+    workers = workers or cpu_count()
+    points = iter(points)
+    stop = Event()
+    executor = ProcessPoolExecutor(
+        workers, initializer=initialize, initargs=(program, task, stop),
+    )
+    pending = {}
+
+    def submit() -> bool:
+        chunk = list(islice(points, chunksize))
+        if chunk:
+            pending[executor.submit(evaluate, chunk)] = chunk
+        return bool(chunk)
+
+    try:
+        # a few chunks per worker in flight, the space is consumed lazily
+        while len(pending) < 4 * workers and submit():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                submit()
+                yield from zip(chunk, future.result())
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def search(
+    program: List[int], points: Iterable[Point],
+    predicate: Callable[[Any], bool], task: Callable = run,
+    workers: Optional[int] = None, chunksize: int = 64,
+) -> Optional[Tuple[Point, Any]]:
+    # first point whose value satisfies `predicate`, not necessarily the
+    # first one in the order of `points`
+    for point, value in sweep(program, points, task, workers, chunksize):
+        if value is not None and predicate(value):
+            return point, value
+    return None
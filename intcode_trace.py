@@ -0,0 +1,185 @@
+"""
+Execution traces of `AMP`.
+
+`Tracer(amp).run()` is a drop-in for `amp.run()` that appends one fixed
+width record per executed instruction to a `Trace`: pointer, instruction,
+relative base, the values of up to two read operands and the cell written
+with its value before and after. All fields are int64, 64 bytes a step.
+
+A `Trace` is a ring buffer keeping the last `capacity` steps, in memory or
+in a memory mapped file that can be reopened with `Trace.open` later on.
+Because every record carries the overwritten value, the VM state at any
+retained step is rebuilt without executing anything: `rewind` undoes
+writes backwards from the memory after the last step, `replay` redoes them
+forwards from the program image as long as nothing was dropped yet.
+"""
+from mmap import ACCESS_READ, mmap
+from struct import Struct
+from typing import List, NamedTuple, Optional
+
+from intcode import AMP
+
+HEADER = Struct("<4sqq")
+RECORD = Struct("<8q")
+MAGIC = b"ICTR"
+
+# operation -> parameters read, parameter written
+READS = {1: 2, 2: 2, 4: 1, 5: 2, 6: 2, 7: 2, 8: 2, 9: 1}
+WRITES = {1: 3, 2: 3, 3: 1, 7: 3, 8: 3}
+
+
+class Step(NamedTuple):
+    ptr: int
+    instruction: int
+    relative_base: int
+    a: int
+    b: int
+    # -1 without a write
+    address: int
+    old: int
+    new: int
+
+
+class State(NamedTuple):
+    ptr: int
+    relative_base: int
+    memory: List[int]
+
+
+class Trace:
+    def __init__(self, capacity: int = 1 << 16, path: Optional[str] = None):
+        self.capacity = capacity
+        # steps recorded so far, including the ones already overwritten
+        self.count = 0
+        self.path = path
+        size = HEADER.size + capacity * RECORD.size
+        if path is None:
+            self.buffer = bytearray(size)
+        else:
+            with open(path, "w+b") as f:
+                f.truncate(size)
+                self.buffer = mmap(f.fileno(), size)
+        self.flush()
+
+    @classmethod
+    def open(cls, path: str) -> "Trace":
+        with open(path, "rb") as f:
+            buffer = mmap(f.fileno(), 0, access=ACCESS_READ)
+        magic, capacity, count = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an Intcode trace")
+        trace = cls.__new__(cls)
+        trace.capacity, trace.count, trace.path = capacity, count, path
+        trace.buffer = buffer
+        return trace
+
+    def flush(self) -> None:
+        HEADER.pack_into(self.buffer, 0, MAGIC, self.capacity, self.count)
+        if self.path is not None:
+            self.buffer.flush()
+
+    def close(self) -> None:
+        if self.path is not None:
+            self.buffer.close()
+
+    @property
+    def first(self) -> int:
+        # oldest step still in the buffer
+        return max(0, self.count - self.capacity)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, *fields: int) -> None:
+        offset = HEADER.size + self.count % self.capacity * RECORD.size
+        RECORD.pack_into(self.buffer, offset, *fields)
+        self.count += 1
+
+    def __getitem__(self, step: int) -> Step:
+        if not self.first <= step < self.count:
+            raise IndexError(f"step {step} is not in the trace")
+        offset = HEADER.size + step % self.capacity * RECORD.size
+        return Step(*RECORD.unpack_from(self.buffer, offset))
+
+
+class Tracer:
+    def __init__(
+        self, amp: AMP, capacity: int = 1 << 16, path: Optional[str] = None,
+    ):
+        self.amp = amp
+        self.inputs = amp.inputs
+        self.trace = Trace(capacity, path)
+
+    def run(self):
+        amp = self.amp
+        program = amp.program
+        decoded = amp.decoded
+        append = self.trace.append
+        try:
+            while amp.ptr < len(program):
+                ptr = amp.ptr
+                op, modes, handler = decoded.get(ptr) or amp.decode(ptr)
+                if op == amp.halt:
+                    break
+
+                instruction = program[ptr]
+                relative_base = amp.relative_base
+                reads = READS.get(op, 0)
+                a = amp.fetch(program[ptr + 1], modes[0]) if reads else 0
+                b = amp.fetch(program[ptr + 2], modes[1]) if reads > 1 else 0
+                written = WRITES.get(op)
+                address, old = -1, 0
+                if written and modes[written - 1] != 1:
+                    address = program[ptr + written]
+                    if modes[written - 1] == 2:
+                        address += relative_base
+                    old = program[address]
+
+                if op == 4:
+                    value = handler(modes)
+                    append(ptr, instruction, relative_base, a, b, -1, 0, 0)
+                    yield value
+                    continue
+                elif op == 3:
+                    yield "INP"
+                    handler(amp.inputs.popleft(), modes)
+                else:
+                    handler(modes)
+                new = program[address] if address >= 0 else 0
+                append(
+                    ptr, instruction, relative_base, a, b, address, old, new,
+                )
+        finally:
+            self.trace.flush()
+
+
+def rewind(trace: Trace, memory: List[int], step: int) -> State:
+    # `memory` as it was after the last recorded step, records may write
+    # past its length
+    highest = max(
+        (trace[done].address for done in range(step, trace.count)),
+        default=-1,
+    )
+    cells = [memory[address] for address in range(len(memory))]
+    if highest >= len(cells):
+        cells.extend([0] * (highest + 1 - len(cells)))
+    for undone in range(trace.count - 1, step - 1, -1):
+        record = trace[undone]
+        if record.address >= 0:
+            cells[record.address] = record.old
+    record = trace[step]
+    return State(record.ptr, record.relative_base, cells)
+
+
+def replay(trace: Trace, program: List[int], step: int) -> State:
+    if trace.first > 0:
+        raise IndexError("the beginning of the trace was overwritten")
+    cells = list(program)
+    for done in range(step):
+        record = trace[done]
+        if record.address >= len(cells):
+            cells.extend([0] * (record.address + 1 - len(cells)))
+        if record.address >= 0:
+            cells[record.address] = record.new
+    record = trace[step]
+    return State(record.ptr, record.relative_base, cells)
@@ -0,0 +1,208 @@
+"""
+Shortest paths on 2D grid mazes.
+
+A maze is a boolean array of open cells, moves go to the four neighbours.
+`flood` runs a breadth-first search from any number of sources at once,
+advancing the whole frontier as one array of flat indices per step
+instead of visiting cells one by one. It returns the distance of every cell
+to the nearest source (-1 where none is reachable) and the largest of them,
+the eccentricity of the sources, e.g. the time oxygen needs to fill the
+maze. `path` walks a shortest path back down the distance map.
+
+Single queries between two cells go to a `Router`, which keeps the maze
+and its bookkeeping as flat lists allocated once and answers with plain
+breadth-first search, A* with the Manhattan distance as heuristic, or a
+breadth-first search from both ends meeting in the middle. All of them are
+iterative and return a shortest path.
+"""
+from heapq import heappop, heappush
+from typing import Iterable, List, NamedTuple, Tuple
+
+from numpy import array, full, ndarray, pad, unique
+
+Cell = Tuple[int, int]
+
+
+class Flood(NamedTuple):
+    distance: ndarray
+    # largest finite distance
+    eccentricity: int
+
+
+def flood(open_cells: ndarray, sources: Iterable[Cell]) -> Flood:
+    # flat indices into the maze padded with a wall all around, so the
+    # neighbours of a cell are always at the same offsets
+    height, width = open_cells.shape
+    stride = width + 2
+    free = pad(open_cells, 1).ravel()
+    distance = full(free.shape, -1)
+    offsets = array([-stride, stride, -1, 1])
+
+    rows, columns = array(list(sources), dtype=int).reshape(-1, 2).T
+    frontier = unique((rows + 1) * stride + columns + 1)
+    frontier = frontier[free[frontier]]
+    step = -1
+    while frontier.size:
+        step += 1
+        free[frontier] = False
+        distance[frontier] = step
+        reached = (frontier[:, None] + offsets).ravel()
+        frontier = unique(reached[free[reached]])
+    distance = distance.reshape(height + 2, stride)[1:-1, 1:-1]
+    return Flood(distance, step)
+
+
+def path(distance: ndarray, target: Cell) -> List[Cell]:
+    # from the nearest source to `target`, empty if it isn't reachable
+    y, x = target
+    if distance[y, x] < 0:
+        return []
+    cells = [(y, x)]
+    height, width = distance.shape
+    while distance[y, x] > 0:
+        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            ny, nx = y + dy, x + dx
+            if (
+                0 <= ny < height and 0 <= nx < width
+                and distance[ny, nx] == distance[y, x] - 1
+            ):
+                y, x = ny, nx
+                break
+        cells.append((y, x))
+    cells.reverse()
+    return cells
+
+
+class Router:
+    def __init__(self, open_cells: ndarray):
+        height, width = open_cells.shape
+        # flat indices as in `flood`
+        self.stride = width + 2
+        self.free: List[bool] = pad(open_cells, 1).ravel().tolist()
+        self.offsets = (-self.stride, self.stride, -1, 1)
+        size = len(self.free)
+        # cells are seen in a query if they carry its stamp, so nothing has
+        # to be cleared between queries
+        self.stamp = 0
+        self.seen = [0] * size
+        self.parent = [-1] * size
+        self.cost = [0] * size
+        # the search from the goal in `bidirectional`
+        self.seen_back = [0] * size
+        self.parent_back = [-1] * size
+        self.cost_back = [0] * size
+
+    def index(self, cell: Cell) -> int:
+        return (cell[0] + 1) * self.stride + cell[1] + 1
+
+    def cell(self, index: int) -> Cell:
+        y, x = divmod(index, self.stride)
+        return y - 1, x - 1
+
+    def trace(self, parent: List[int], index: int) -> List[Cell]:
+        # back from `index` to the cell without a parent
+        cells = []
+        while index >= 0:
+            cells.append(self.cell(index))
+            index = parent[index]
+        return cells
+
+    def begin(self, start: Cell, goal: Cell) -> Tuple[int, int, int]:
+        # (source, target, stamp), source -1 if there is nothing to search
+        source, target = self.index(start), self.index(goal)
+        if not (self.free[source] and self.free[target]):
+            source = -1
+        self.stamp += 1
+        return source, target, self.stamp
+
+    def bfs(self, start: Cell, goal: Cell) -> List[Cell]:
+        source, target, stamp = self.begin(start, goal)
+        if source < 0:
+            return []
+        free, seen, parent = self.free, self.seen, self.parent
+        seen[source], parent[source] = stamp, -1
+        # grows while it's iterated
+        queue = [source]
+        for index in queue:
+            if index == target:
+                return self.trace(parent, index)[::-1]
+            for offset in self.offsets:
+                neighbour = index + offset
+                if free[neighbour] and seen[neighbour] != stamp:
+                    seen[neighbour], parent[neighbour] = stamp, index
+                    queue.append(neighbour)
+        return []
+
+    def astar(self, start: Cell, goal: Cell) -> List[Cell]:
+        source, target, stamp = self.begin(start, goal)
+        if source < 0:
+            return []
+        free, seen = self.free, self.seen
+        parent, cost = self.parent, self.cost
+        stride = self.stride
+        ty, tx = divmod(target, stride)
+
+        seen[source], parent[source], cost[source] = stamp, -1, 0
+        # ties go to the deeper cell, which is closer to the goal
+        heap = [(0, 0, source)]
+        while heap:
+            _, _, index = heappop(heap)
+            if index == target:
+                return self.trace(parent, index)[::-1]
+            following = cost[index] + 1
+            for offset in self.offsets:
+                neighbour = index + offset
+                if not free[neighbour]:
+                    continue
+                elif seen[neighbour] == stamp and cost[neighbour] <= following:
+                    continue
+                seen[neighbour], parent[neighbour] = stamp, index
+                cost[neighbour] = following
+                y, x = divmod(neighbour, stride)
+                estimate = following + abs(y - ty) + abs(x - tx)
+                heappush(heap, (estimate, -following, neighbour))
+        return []
+
+    def bidirectional(self, start: Cell, goal: Cell) -> List[Cell]:
+        source, target, stamp = self.begin(start, goal)
+        if source < 0:
+            return []
+        free, offsets = self.free, self.offsets
+        sides = (
+            (self.seen, self.parent, self.cost),
+            (self.seen_back, self.parent_back, self.cost_back),
+        )
+        for (seen, parent, cost), root in zip(sides, (source, target)):
+            seen[root], parent[root], cost[root] = stamp, -1, 0
+        frontiers = [[source], [target]]
+
+        while frontiers[0] and frontiers[1]:
+            # grow the smaller side by a whole level, the shortest path
+            # goes through the best meeting point found on it
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, parent, cost = sides[side]
+            other_seen, _, other_cost = sides[1 - side]
+            level = []
+            best, meeting = -1, -1
+            for index in frontiers[side]:
+                if other_seen[index] == stamp:
+                    # only the two roots, when start is the goal
+                    best, meeting = 0, index
+                    break
+                for offset in offsets:
+                    neighbour = index + offset
+                    if not free[neighbour] or seen[neighbour] == stamp:
+                        continue
+                    seen[neighbour], parent[neighbour] = stamp, index
+                    cost[neighbour] = cost[index] + 1
+                    level.append(neighbour)
+                    if other_seen[neighbour] == stamp and (
+                        best < 0 or other_cost[neighbour] < best
+                    ):
+                        best, meeting = other_cost[neighbour], neighbour
+            if meeting >= 0:
+                forward = self.trace(self.parent, meeting)[::-1]
+                back = self.trace(self.parent_back, meeting)
+                return forward + back[1:]
+            frontiers[side] = level
+        return []